@@ -0,0 +1,16 @@
+import importlib
+import pathlib
+import sys
+
+
+def main(argv: list[str]) -> None:
+    names = sorted(path.stem for path in pathlib.Path(__file__).parent.glob('bench_*.py'))
+    if argv:
+        names = [name for name in names if any(pattern in name for pattern in argv)]
+    for name in names:
+        print(f'# {name}')
+        importlib.import_module(f'{__package__}.{name}').main()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,22 @@
+from .common import headless_block, measure, report
+
+
+sizes = [10, 100, 1000, 10000]
+
+
+def main() -> None:
+    for size in sizes:
+        code = headless_block(size)
+        middle = size // 2
+        def insert_remove():
+            lines = code.insert_lines(middle, 'inserted = True', plain=True)
+            code.remove_lines(lines)
+        def replace():
+            line = code.lines[middle]
+            code.replace_lines([line], line.string, plain=True)
+        report('insert + remove', lines=size, seconds=measure(insert_remove, repeat=3))
+        report('replace', lines=size, seconds=measure(replace, repeat=3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+import time
+
+from .common import headless_block, report
+
+
+sizes = [1000, 5000]
+
+
+def main() -> None:
+    for size in sizes:
+        code = headless_block()
+        code._insert_lines(0, code._create_lines(*(f'line {index}' for index in range(size)), plain=True))
+        start = time.perf_counter()
+        code.clear()
+        report('clear', lines=size, seconds=time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
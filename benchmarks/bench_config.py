@@ -0,0 +1,16 @@
+from canim import CodeConfig, themes
+
+from .common import measure, report
+
+
+count = 1000
+
+
+def main() -> None:
+    report('CodeConfig()', configs=count, seconds=measure(lambda: [CodeConfig() for _ in range(count)]))
+    report('CodeConfig().theme.syntax', configs=count, seconds=measure(lambda: [CodeConfig().theme.syntax for _ in range(count)]))
+    report('CodeConfig(theme=Bauhaus())', configs=count, seconds=measure(lambda: [CodeConfig(theme=themes.Bauhaus()) for _ in range(count)]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+import tempfile
+
+from canim import CodeConfig
+from canim.fontalignment import FontAlignment
+
+from .common import measure, report, source
+
+
+def main() -> None:
+    theme = CodeConfig().theme
+    create = lambda cache_directory=None: FontAlignment(
+        font = theme.font,
+        font_size = theme.font_size,
+        cache_directory = cache_directory,
+        headless = True,
+    )
+    report('FontAlignment()', seconds=measure(create, repeat=3))
+    with tempfile.TemporaryDirectory() as cache_directory:
+        create(cache_directory)
+        report('FontAlignment() (cached)', seconds=measure(lambda: create(cache_directory)))
+    font_alignment = create()
+    lines = source(1000).splitlines()
+    def cold():
+        font_alignment._top_margins.clear()
+        for line in lines:
+            font_alignment.top_margin(line)
+    def warm():
+        for line in lines:
+            font_alignment.top_margin(line)
+    report('top_margin', lines=len(lines), seconds=measure(cold))
+    report('top_margin (memoized)', lines=len(lines), seconds=measure(warm))
+
+
+if __name__ == '__main__':
+    main()
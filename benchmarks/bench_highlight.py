@@ -0,0 +1,25 @@
+import pathlib
+
+import canim
+from canim import CodeConfig
+from canim.syntaxhighlighter import SyntaxHighligher
+
+from .common import measure, report
+
+
+def main() -> None:
+    source = pathlib.Path(canim.__file__).with_name('codeblock.py').read_text()
+    lines = [line.strip() for line in source.splitlines() if line.strip()]
+    highlighter = SyntaxHighligher('python', CodeConfig().theme.syntax)
+    per_line = measure(lambda: [highlighter.highlight(line) for line in lines])
+    report('highlight', lines=len(lines), lines_per_second=len(lines) / per_line)
+    def batch():
+        highlighter._lines.clear()
+        highlighter.highlight_lines(lines)
+    report('highlight_lines', lines=len(lines), lines_per_second=len(lines) / measure(batch))
+    cached = measure(lambda: highlighter.highlight_lines(lines))
+    report('highlight_lines (cached)', lines=len(lines), lines_per_second=len(lines) / cached)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,22 @@
+from canim.codeline import CodeLineGroup
+
+from .common import headless_block, measure, report
+
+
+sizes = [100, 1000, 2000]
+
+
+def main() -> None:
+    for size in sizes:
+        code = headless_block()
+        code._insert_lines(0, code._create_lines(*(f'line {index}' for index in range(size)), plain=True))
+        extra = code._create_lines('extra', plain=True)
+        def edit():
+            code._insert_lines(size // 2, extra)
+            CodeLineGroup(code, code.lines[::10])
+            code._remove_lines(extra)
+        report('index', lines=size, seconds_per_edit=measure(edit))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+from canim.codeline import CodeLine
+
+from .common import headless_block, measure, report, source
+
+
+sizes = [100, 1000, 10000]
+
+
+def main() -> None:
+    code = headless_block(prompts=['>>> ', '... '])
+    for size in sizes:
+        lines = [f'>>> {line}' for line in source(size).splitlines()]
+        report('CodeLine.split', lines=size, seconds=measure(lambda: [CodeLine.split(code, line) for line in lines]))
+        report('CodeLine.split_all', lines=size, seconds=measure(lambda: CodeLine.split_all(code, lines)))
+        report('CodeLine.parse', lines=size, seconds=measure(lambda: [CodeLine.parse(code, line) for line in lines]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+import textwrap
+
+from canim import CodeConfig
+from canim.codeline import split_enclosure
+from canim.utils import split_lines
+
+from .common import measure, report, source
+
+
+sizes = [100, 1000, 10000]
+
+
+def main() -> None:
+    for size in sizes:
+        string = textwrap.indent(source(size), '        ')
+        report('split_lines', lines=size, seconds=measure(lambda: split_lines(string)))
+    enclosure_regex = CodeConfig(prompts=['>>> ', '... ']).enclosure_regex
+    for size in sizes:
+        lines = ['>>> try:', '...     {...}', '... except Exception:', *(f'...     handle({index})' for index in range(size))]
+        string = '\n'.join(lines)
+        report('split_enclosure', lines=size, seconds=measure(lambda: split_enclosure(enclosure_regex, string)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+from __future__ import annotations
+from typing import Any, Callable
+
+import time
+
+from canim import LayoutScene
+from canim.codeblock import CodeBlock
+
+
+def measure(function: Callable[[], Any], repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(name: str, **fields: Any) -> None:
+    values = ' '.join(f'{key}={value:.6f}' if isinstance(value, float) else f'{key}={value}' for key, value in fields.items())
+    print(f'{name:<30} {values}')
+
+
+def source(size: int) -> str:
+    output: list[str] = []
+    for index in range(size):
+        if index % 4 == 0:
+            output.append(f'def function_{index}(argument):')
+        else:
+            output.append(f'    value_{index} = argument * {index}  # step {index}')
+    return '\n'.join(output)
+
+
+def headless_block(size: int = 0, **config: Any) -> CodeBlock:
+    config.setdefault('cache', False)
+    code = LayoutScene().code(**config)
+    if size:
+        code.append_lines(source(size), plain=True)
+    return code
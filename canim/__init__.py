@@ -1,5 +1,6 @@
 from .codescene import code_animation, CodeScene
 from .codeconfig import CodeConfig
+from .layout import LayoutScene
 from . import themes
 
 
@@ -7,5 +8,6 @@ __all__ = [
     'code_animation',
     'CodeScene',
     'CodeConfig',
+    'LayoutScene',
     'themes',
 ]
\ No newline at end of file
@@ -0,0 +1,110 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+import numpy as np
+from manim import LEFT, Animation, Group, Mobject, VMobject
+
+if TYPE_CHECKING:
+    from manim import Scene
+
+
+class Translate(Animation):
+
+    def __init__(self, *mobjects: Mobject, vector: np.ndarray, **kwargs):
+        super().__init__(Group(*mobjects), **kwargs)
+        self.vector = np.asarray(vector, dtype=float)
+        self._members: list[Mobject] = []
+        self._start: np.ndarray = None
+        self._buffer: np.ndarray = None
+
+    def begin(self) -> None:
+        self._members = self.mobject.family_members_with_points()
+        if self._members:
+            self._start = np.concatenate([member.points for member in self._members])
+        else:
+            self._start = np.zeros((0, 3))
+        self._buffer = self._start.copy()
+        offset = 0
+        for member in self._members:
+            size = len(member.points)
+            member.points = self._buffer[offset:offset + size]
+            offset += size
+        super().begin()
+
+    def finish(self) -> None:
+        super().finish()
+        for member in self._members:
+            member.points = member.points.copy()
+        self._members = []
+        self._start = self._buffer = None
+
+    def create_starting_mobject(self) -> Mobject:
+        return self.mobject
+
+    def interpolate_mobject(self, alpha: float) -> None:
+        np.add(self._start, self.rate_func(alpha) * self.vector, out=self._buffer)
+
+    def clean_up_from_scene(self, scene: Scene) -> None:
+        super().clean_up_from_scene(scene)
+        if self.mobject in scene.mobjects:
+            index = scene.mobjects.index(self.mobject)
+            scene.mobjects[index:index + 1] = self.mobject.submobjects
+
+
+class Widen(Translate):
+
+    def __init__(self, *mobjects: Mobject, widths: list[float], **kwargs):
+        super().__init__(*mobjects, vector=np.zeros(3), **kwargs)
+        self.widths = widths
+
+    def begin(self) -> None:
+        targets = [
+            mobject.copy().stretch_to_fit_width(width, about_edge=LEFT)
+            for mobject, width in zip(self.mobject.submobjects, self.widths)
+        ]
+        super().begin()
+        self.vector = np.concatenate([target.points for target in targets]) - self._start
+
+
+class MorphText(Animation):
+
+    def __init__(self, text: VMobject, target: VMobject, matches: list[tuple[int, int]], **kwargs):
+        super().__init__(text, **kwargs)
+        self.target = target
+        self.matches = matches
+        self._glyphs: list[tuple[VMobject, VMobject, VMobject]] = []
+
+    def begin(self) -> None:
+        glyphs, targets = self.mobject.submobjects, self.target.submobjects
+        kept, placed = set(), set()
+        for index, target_index in self.matches:
+            glyph, target = glyphs[index], targets[target_index]
+            glyph.align_data(target)
+            self._glyphs.append((glyph, glyph.copy(), target))
+            kept.add(index)
+            placed.add(target_index)
+        for index, glyph in enumerate(glyphs):
+            if index not in kept:
+                self._glyphs.append((glyph, glyph.copy(), glyph.copy().set_fill(opacity=0)))
+        added = []
+        for target_index, target in enumerate(targets):
+            if target_index not in placed:
+                glyph = target.copy()
+                self._glyphs.append((glyph, target.copy().set_fill(opacity=0), target))
+                added.append(glyph)
+        self.mobject.add(*added)
+        super().begin()
+
+    def create_starting_mobject(self) -> Mobject:
+        return self.mobject
+
+    def interpolate_mobject(self, alpha: float) -> None:
+        alpha = self.rate_func(alpha)
+        for glyph, start, end in self._glyphs:
+            glyph.interpolate(start, end, alpha)
+
+    def clean_up_from_scene(self, scene: Scene) -> None:
+        super().clean_up_from_scene(scene)
+        scene.remove(self.mobject)
+        scene.add(self.target)
+        self._glyphs = []
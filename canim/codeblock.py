@@ -1,16 +1,21 @@
 from __future__ import annotations
-from typing import Any, Generator, Pattern
+from typing import Any, ContextManager, Generator, Iterator, Pattern
 
 import contextlib
 import collections
+import difflib
+import itertools
+import json
+import math
 import pathlib
 import re
 
+import numpy as np
 from manim import (
     UL,
-    LEFT,
     RIGHT,
     DOWN,
+    Mobject,
     MarkupText,
     Rectangle,
     Animation,
@@ -18,11 +23,13 @@ from manim import (
     FadeOut,
     ReplacementTransform,
     LaggedStart,
+    config as manim_config,
 )
 from manim_voiceover import VoiceoverTracker
 from manim_voiceover.services.recorder import RecorderService
 
-from .utils import split_lines
+from .profiler import Profiler, profiled
+from .utils import log, read_lines, set_debug, split_lines
 
 
 bookmark_regex = re.compile(r'\{(.*?)\}')
@@ -30,22 +37,50 @@ bookmark_regex = re.compile(r'\{(.*?)\}')
 
 class CodeBlock:
 
+    snapshot_version = 2
+
     def __init__(self, scene: CodeScene, config: CodeConfig):
         self.scene = scene
         self.config = config
+        if config.debug:
+            set_debug(True)
         self.lines: list[CodeLine] = []
+        self._indexed = True
         self._stash: dict[str, Any] = {}
         self._transitions: list[Animation] = []
+        self._shifts: dict[tuple[float, ...], list[Mobject]] = {}
+        self._moving_lines: set[CodeLine] = set()
+        self._pending: Iterator[str] = None
+        self._pending_plain: bool = None
+        self._virtualize = config.virtualize
+        self._highlight_pool: list[Rectangle] = []
+        self._prompt_templates: dict[str, MarkupText] = {}
+        if config.profile:
+            if scene.profiler is None:
+                scene.profiler = Profiler()
+            self.profiler = scene.profiler
+        else:
+            self.profiler = None
         if config.language:
-            self._syntax_highlighter = SyntaxHighligher(config.language, config.theme.syntax)
+            self._syntax_highlighter = SyntaxHighligher(config.language, config.theme.syntax, config.cache_size)
         else:
             self._syntax_highlighter = None
-        self._font_alignment = FontAlignment(
-            font = self.theme.font,
-            font_size = self.theme.font_size,
-            paragraph_font = self.theme.paragraph_font or self.theme.title_font,
-            paragraph_size = self.theme.paragraph_size,
-        )
+        if config.cache:
+            cache_directory = pathlib.Path(config.cache_directory or pathlib.Path(manim_config.media_dir) / 'canim')
+            self.text_cache = TextCache.shared(cache_directory / 'texts', config.cache_size)
+        else:
+            cache_directory = None
+            self.text_cache = None
+        with self._profile('font_alignment', 'layout'):
+            self._font_alignment = FontAlignment(
+                font = self.theme.font,
+                font_size = self.theme.font_size,
+                paragraph_font = self.theme.paragraph_font or self.theme.title_font,
+                paragraph_size = self.theme.paragraph_size,
+                glyph_ranges = self.theme.glyph_ranges,
+                cache_directory = cache_directory and cache_directory / 'fonts',
+                headless = config.headless,
+            )
         if self.config.voiceover:
             self.scene.set_speech_service(RecorderService())
         self.config.theme.init(self.scene)
@@ -59,8 +94,13 @@ class CodeBlock:
         lines = []
         for index in selector:
             if isinstance(index, int):
+                self._pull_until(index)
                 lines.append(self.lines[index])
             else:
+                if index.stop is None or index.stop < 0 or (index.start or 0) < 0:
+                    self._pull_until(None)
+                else:
+                    self._pull_until(index.stop - 1)
                 lines.extend(self.lines[index])
         return CodeLineGroup(self, lines)
     
@@ -113,17 +153,21 @@ class CodeBlock:
     def left(self):
         return -self.config.width / 2 + self.theme.horizontal_padding
 
+    @profiled
     def scroll_into_view(self, first_line: CodeLine, last_line: CodeLine = None) -> None:
         scroll = self._find_scroll_for(first_line, last_line)
         self._animate_slide(scroll)
     
+    @profiled
     def scroll_to_end(self, buffer: int) -> None:
+        self._pull_lines()
         if not self.lines:
             return
         scroll = self._find_scroll_for(self.lines[-1])
         scroll -= (self._font_alignment.height + self.theme.line_gap) * buffer
         self._animate_slide(scroll)
 
+    @profiled
     def insert_lines(
             self,
             index: int,
@@ -133,13 +177,14 @@ class CodeBlock:
             indent_prompt: str = None,
             plain: bool = None,
     ) -> list[CodeLine]:
-        lines = self._create_lines(*strings, plain=plain)
-        if not lines:
-            return
         if index < 0:
             index = 0
+        self._pull_until(index)
         if index > len(self.lines):
             index = len(self.lines)
+        lines = self._create_lines(*strings, index=index, plain=plain)
+        if not lines:
+            return
         indent_lines = self._resolve_lines(index, indent_lines)
         self._animate_insert(
             insertions = {index: lines},
@@ -149,6 +194,7 @@ class CodeBlock:
             plain = plain,
         )
         self._insert_lines(index, lines)
+        self._relex_lines(index + len(lines))
         return lines
 
     def prepend_lines(
@@ -176,6 +222,7 @@ class CodeBlock:
             indent_prompt: str = None,
             plain: bool = None,
     ) -> list[CodeLine]:
+        self._pull_lines()
         return self.insert_lines(
             len(self.lines),
             *strings,
@@ -185,6 +232,7 @@ class CodeBlock:
             plain = plain,
         )
     
+    @profiled
     def remove_lines(
             self,
             lines: list[CodeLine],
@@ -195,6 +243,7 @@ class CodeBlock:
         if not lines:
             return
         self._sort_lines(lines)
+        start = lines[0].index
         index = lines[-1].index + 1
         dedent_lines = self._resolve_lines(index, dedent_lines)
         self._sort_lines(dedent_lines)
@@ -205,10 +254,13 @@ class CodeBlock:
             dedent_prompt = dedent_prompt,
         )
         self._remove_lines(lines)
+        self._relex_lines(start)
     
     def clear(self) -> None:
+        self._pending = None
         self.remove_lines(self.lines.copy())
     
+    @profiled
     def replace_lines(
             self,
             lines: list[CodeLine],
@@ -217,12 +269,26 @@ class CodeBlock:
             indent_level: int = None,
             indent_prompt: str = None,
             plain: bool = None,
+            diff: bool = None,
     ) -> list[CodeLine]:
-        new_lines = self._create_lines(*strings, plain=plain)
-        if not lines or not new_lines:
+        if not lines:
             return
         self._sort_lines(lines)
+        if diff is None:
+            diff = self.config.diff
+        if diff:
+            return self._diff_lines(
+                lines,
+                [line for string in strings for line in split_lines(string)],
+                indent_lines = indent_lines,
+                indent_level = indent_level,
+                indent_prompt = indent_prompt,
+                plain = plain,
+            )
         index = lines[0].index
+        new_lines = self._create_lines(*strings, index=index, plain=plain)
+        if not new_lines:
+            return
         indent_lines = self._resolve_lines(index, indent_lines)
         self._animate_insert(
             insertions = {index: new_lines},
@@ -234,8 +300,36 @@ class CodeBlock:
         )
         self._insert_lines(index, new_lines)
         self._remove_lines(lines)
+        self._relex_lines(new_lines[-1].index + 1)
         return new_lines
     
+    @profiled
+    def update(self, source: str, plain: bool = None) -> list[CodeLine]:
+        self._pull_lines()
+        return self._diff_lines(self.lines.copy(), split_lines(source), plain=plain)
+
+    @profiled
+    def load(self, path: str|pathlib.Path, start: int = None, end: int = None, plain: bool = None) -> None:
+        self._pull_lines()
+        self._pending = read_lines(path, start, end)
+        self._pending_plain = plain
+        self._virtualize = True
+        index = len(self.lines)
+        if not self._pull_lines(1):
+            return
+        scroll = self.lines[index].top - self.top
+        self._fill_view(scroll)
+        new_lines = self.lines[index:]
+        for line in new_lines:
+            line._slide(scroll)
+        self._animate_slide(scroll, self.lines[:index])
+        for line in new_lines:
+            if self._in_view(line):
+                line._detached = False
+                line._animate_insert(plain=True)
+        self._play_transitions()
+
+    @profiled
     def enclose_lines(
             self,
             lines: list[CodeLine],
@@ -250,9 +344,9 @@ class CodeBlock:
             return
         self._sort_lines(lines)
         before_index = lines[0].index
-        before_lines = self._create_lines(before, plain=plain)
+        before_lines = self._create_lines(before, index=before_index, plain=plain)
         after_index = lines[-1].index + 1
-        after_lines = self._create_lines(after, plain=plain)
+        after_lines = self._create_lines(after, index=after_index, plain=plain)
         new_lines = [*before_lines, *after_lines]
         self._animate_insert(
             insertions = {before_index: before_lines, after_index: after_lines},
@@ -263,18 +357,24 @@ class CodeBlock:
         )
         self._insert_lines(before_index, before_lines)
         self._insert_lines(after_index, after_lines)
+        for inserted_lines in (before_lines, after_lines):
+            if inserted_lines:
+                self._relex_lines(inserted_lines[-1].index + 1)
         return new_lines
     
+    @profiled
     @contextlib.contextmanager
     def highlight_lines(self, lines: list[CodeLine]) -> Generator[None, None, None]:
         if not lines:
             return
         self._sort_lines(lines)
         self.scroll_into_view(lines[0], lines[-1])
-        other_lines = [line for line in self.lines if line not in lines]
+        selected_lines = set(lines)
+        other_lines = [line for line in self.lines if line not in selected_lines]
         with self._animate_opacity(self.theme.dimmed_opacity, other_lines):
             yield
 
+    @profiled
     @contextlib.contextmanager
     def highlight_pattern(self, pattern: str|Pattern, lines: list[CodeLine] = None) -> Generator[None, None, None]:
         if not lines:
@@ -289,11 +389,79 @@ class CodeBlock:
         with self._animate_opacity(0, lines):
             yield
 
+    def snapshot(self, path: str|pathlib.Path = None) -> dict[str, Any]:
+        pending = list(self._pending) if self._pending is not None else None
+        if pending is not None:
+            self._pending = iter(pending)
+        line_height = self._font_alignment.height + self.theme.line_gap
+        space_width = self._font_alignment.space_width
+        snapshot = dict(
+            version = self.snapshot_version,
+            small = self.config.small,
+            virtualize = self._virtualize,
+            lines = [
+                [
+                    line.content,
+                    line.indent,
+                    line._prompt_string,
+                    line._markup,
+                    line._stable,
+                    (self.top - line.top) / line_height,
+                    (line.left - self.left) / space_width,
+                    line._opacity,
+                ]
+                for line in self.lines
+            ],
+            pending = pending,
+            pending_plain = self._pending_plain,
+        )
+        if path:
+            pathlib.Path(path).write_text(json.dumps(snapshot, separators=(',', ':')))
+        return snapshot
+
+    def restore(self, snapshot: str|pathlib.Path|dict[str, Any]) -> list[CodeLine]:
+        if not isinstance(snapshot, dict):
+            snapshot = json.loads(pathlib.Path(snapshot).read_text())
+        if snapshot['version'] != self.snapshot_version:
+            raise ValueError(f'unsupported snapshot version {snapshot["version"]!r}')
+        self._pending = None
+        for line in self.lines:
+            if not line._detached and line._text is not None:
+                self.scene.remove(*line._mobjects)
+        self._remove_lines(self.lines.copy())
+        if snapshot['small'] != self.config.small:
+            self.config.small = snapshot['small']
+            animate, self.theme.animate = self.theme.animate, False
+            try:
+                self.theme.resize(self.scene)
+            finally:
+                self.theme.animate = animate
+        self._virtualize = snapshot['virtualize']
+        line_height = self._font_alignment.height + self.theme.line_gap
+        space_width = self._font_alignment.space_width
+        lines: list[CodeLine] = []
+        for content, indent, prompt, markup, stable, row, column, opacity in snapshot['lines']:
+            line = CodeLine(self, content, indent=indent, prompt=prompt, markup=markup, stable=stable)
+            line._virtual_position = self.top - row * line_height, self.left + column * space_width
+            line._detached = True
+            line._opacity = opacity
+            lines.append(line)
+        self._insert_lines(0, lines)
+        if snapshot['pending'] is not None:
+            self._pending = iter(snapshot['pending'])
+            self._pending_plain = snapshot['pending_plain']
+        for line in lines:
+            if not self._virtualize or self._in_view(line):
+                line._reveal()
+        log('restored %d lines from snapshot', len(lines))
+        return lines
+
     def resize(self) -> None:
         self.clear()
         self.config.small = not self.config.small
         self.config.theme.resize(self.scene)
     
+    @profiled
     @contextlib.contextmanager
     def title(self, content: str) -> Generator[None, None, None]:
         with self.hidden_lines():
@@ -308,6 +476,7 @@ class CodeBlock:
                 self._add_transition(FadeOut(text))
                 self._play_transitions()
 
+    @profiled
     @contextlib.contextmanager
     def paragraph(self, content: str) -> Generator[Paragraph, None, None]:
         with self.hidden_lines():
@@ -324,24 +493,50 @@ class CodeBlock:
                 self._add_transition(FadeOut(paragraph.text))
                 self._play_transitions()
 
+    def _profile(self, name: str, category: str, **args: Any) -> ContextManager[None]:
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.span(name, category, **args)
+
     def _add_transition(self, transition: Animation) -> None:
         self._transitions.append(transition)
     
-    def _play_transitions(self, lag=None) -> None:
+    def _add_shift(self, mobject: Mobject, vector: np.ndarray) -> None:
+        key = tuple(np.round(vector, 6))
+        self._shifts.setdefault(key, []).append(mobject)
+
+    def _play_transitions(self) -> None:
+        for vector, mobjects in self._shifts.items():
+            self._transitions.append(Translate(*mobjects, vector=np.array(vector)))
+        self._shifts.clear()
         if not self._transitions:
             return
         run_time = self.config.transition_speed
-        if lag:
-            self.scene.play(LaggedStart(*self._transitions, lag_ratio=lag, run_time=run_time))
-        else:
+        with self._profile('play', 'play', animations=len(self._transitions)):
             self.scene.play(*self._transitions, run_time=run_time)
         self._transitions.clear()
+        for line in self._moving_lines:
+            line._invalidate_geometry()
+        self._moving_lines.clear()
+        self._virtualize_lines()
         
     def _insert_lines(self, index: int, lines: list[CodeLine]) -> None:
         self.lines[index:index] = lines
+        self._indexed = False
 
     def _remove_lines(self, lines: list[CodeLine]) -> None:
-        self.lines = [line for line in self.lines if line not in lines]
+        removed_lines = set(lines)
+        self.lines = [line for line in self.lines if line not in removed_lines]
+        for line in lines:
+            line._index = None
+        self._indexed = False
+    
+    def _index_of(self, line: CodeLine) -> None|int:
+        if not self._indexed:
+            for index, block_line in enumerate(self.lines):
+                block_line._index = index
+            self._indexed = True
+        return line._index
     
     def _create_text(
             self,
@@ -362,24 +557,179 @@ class CodeBlock:
             right, _ = self.theme.text_offset
             width = self.config.width - self.theme.horizontal_padding * 2 - abs(right)
             content = self._font_alignment.wrap_paragraph(width, content)
-        text = MarkupText(
+        create = lambda: MarkupText(
             text = content,
             font = font,
             font_size = font_size,
             color = font_color,
         )
+        with self._profile('create_text', 'text'):
+            if self.config.headless:
+                text = LayoutText(content, self._font_alignment, font_size=font_size, color=font_color)
+            elif self.text_cache:
+                text = self.text_cache.get(create, content, font, font_size, font_color)
+            else:
+                text = create()
         text.z_index = self.theme.text_z_index
         return text
 
-    def _create_lines(self, *strings: str, plain: bool = None) -> list[CodeLine]:
-        lines: list[CodeLine] = []
-        for string in strings:
-            for line in split_lines(string):
-                lines.append(CodeLine.parse(self, line, plain=plain))
-        return lines
+    def _create_prompt(self, prompt: str) -> MarkupText:
+        template = self._prompt_templates.get(prompt)
+        if template is None:
+            template = self._prompt_templates[prompt] = self._create_text(prompt)
+        return template.copy()
+
+    def _diff_lines(
+            self,
+            lines: list[CodeLine],
+            strings: list[str],
+            indent_lines: int|CodeLineGroup|list[CodeLine] = None,
+            indent_level: int = None,
+            indent_prompt: str = None,
+            plain: bool = None,
+    ) -> list[CodeLine]:
+        matcher = difflib.SequenceMatcher(None, [line.string for line in lines], strings, autojunk=False)
+        insertions: dict[int, list[CodeLine]] = {}
+        removed_lines: list[CodeLine] = []
+        result_lines: list[CodeLine] = []
+        for tag, start, end, new_start, new_end in matcher.get_opcodes():
+            if tag == 'equal':
+                result_lines.extend(lines[start:end])
+                continue
+            if start < len(lines):
+                index = lines[start].index
+            elif lines:
+                index = lines[-1].index + 1
+            else:
+                index = len(self.lines)
+            removed_lines.extend(lines[start:end])
+            if new_end > new_start:
+                parsed_lines = CodeLine.split_all(self, strings[new_start:new_end])
+                new_lines = self._build_lines(parsed_lines, index=index, plain=plain)
+                insertions[index] = new_lines
+                result_lines.extend(new_lines)
+        log('diff: %d lines kept, %d removed, %d inserted', len(lines) - len(removed_lines), len(removed_lines), sum(map(len, insertions.values())))
+        if not insertions:
+            self.remove_lines(removed_lines)
+            return result_lines
+        indent_lines = self._resolve_lines(min(insertions), indent_lines)
+        self._animate_insert(
+            insertions = insertions,
+            replace_lines = removed_lines,
+            indent_lines = indent_lines,
+            indent_level = indent_level,
+            indent_prompt = indent_prompt,
+            plain = plain,
+            morph = not plain,
+        )
+        for index in sorted(insertions, reverse=True):
+            self._insert_lines(index, insertions[index])
+        self._remove_lines(removed_lines)
+        for new_lines in insertions.values():
+            self._relex_lines(new_lines[-1].index + 1)
+        return result_lines
+
+    def _create_lines(self, *strings: str, index: int = None, plain: bool = None) -> list[CodeLine]:
+        parsed_lines = CodeLine.split_all(self, (line for string in strings for line in split_lines(string)))
+        return self._build_lines(parsed_lines, index=index, plain=plain)
+
+    def _build_lines(self, parsed_lines: list[tuple[str, int, str]], index: int = None, plain: bool = None) -> list[CodeLine]:
+        if plain or not self._syntax_highlighter:
+            return [
+                CodeLine(self, content, indent=indent, prompt=prompt, plain=plain)
+                for prompt, indent, content in parsed_lines
+            ]
+        with self._profile('highlight_lines', 'highlight', lines=len(parsed_lines)):
+            highlighted_lines = self._syntax_highlighter.highlight_lines(
+                [content for _, _, content in parsed_lines],
+                context = self._highlight_context(index),
+            )
+        return [
+            CodeLine(self, content, indent=indent, prompt=prompt, plain=plain, markup=markup, stable=stable)
+            for (prompt, indent, content), (markup, stable) in zip(parsed_lines, highlighted_lines)
+        ]
+    
+    def _relex_lines(self, index: int) -> None:
+        if not self._syntax_highlighter:
+            return
+        count = 8
+        while index < len(self.lines):
+            lines: list[CodeLine] = []
+            for line in self.lines[index:index + count]:
+                if line._plain:
+                    break
+                lines.append(line)
+            if not lines:
+                break
+            with self._profile('highlight_lines', 'highlight', lines=len(lines)):
+                highlighted_lines = self._syntax_highlighter.highlight_lines(
+                    [line.content for line in lines],
+                    context = self._highlight_context(index),
+                )
+            for line, (markup, stable) in zip(lines, highlighted_lines):
+                if stable and line._stable and markup == line._markup:
+                    self._play_transitions()
+                    return
+                line._animate_recolor(markup, stable)
+            if len(lines) < count:
+                break
+            index += count
+            count *= 2
+        self._play_transitions()
+
+    def _highlight_context(self, index: int = None) -> list[str]:
+        if index is None:
+            index = len(self.lines)
+        context: list[str] = []
+        for line_index in range(index - 1, -1, -1):
+            line = self.lines[line_index]
+            context.append(line.content)
+            if line._stable:
+                break
+        context.reverse()
+        return context
     
+    def _pull_lines(self, count: int = None) -> list[CodeLine]:
+        if self._pending is None:
+            return []
+        strings = list(itertools.islice(self._pending, count))
+        if count is None or len(strings) < count:
+            self._pending = None
+        if not strings:
+            return []
+        index = len(self.lines)
+        parsed_lines = CodeLine.split_all(self, strings)
+        lines = self._build_lines(parsed_lines, index=index, plain=self._pending_plain)
+        if self.lines:
+            top, left = self.lines[-1].bottom, self.lines[-1].left
+        else:
+            top, left = self.top, self.left
+        for line in lines:
+            line._virtual_position = top, left
+            line._detached = True
+            top = line.bottom
+        self._insert_lines(index, lines)
+        log('pulled %d lines from source', len(lines))
+        return lines
+
+    def _pull_until(self, index: None|int) -> None:
+        if self._pending is None:
+            return
+        if index is None or index < 0:
+            self._pull_lines()
+        elif index >= len(self.lines):
+            self._pull_lines(index - len(self.lines) + 1)
+
+    def _fill_view(self, offset: float = 0) -> None:
+        if self._pending is None:
+            return
+        line_height = self._font_alignment.height + self.theme.line_gap
+        bottom = self.bottom - self.config.virtualize_margin * line_height + offset
+        last_bottom = self.lines[-1].bottom if self.lines else self.top
+        if last_bottom > bottom:
+            self._pull_lines(math.ceil((last_bottom - bottom) / line_height))
+
     def _sort_lines(self, lines: list[CodeLine]) -> None:
-        print([line.index for line in lines])
         lines.sort(key=lambda line: line.index)
     
     def _resolve_lines(self, index: int, lines: int|CodeLineGroup|list[CodeLine]) -> list[CodeLine]:
@@ -393,40 +743,61 @@ class CodeBlock:
         return lines
 
     def _position_lines(self, lines: list[CodeLine], index: int, offset: float) -> None:
-        prev_line: CodeLine = None
-        for line_index, line in enumerate(lines, index):
-            if line_index == 0:
-                if not self.lines:
-                    line._position(self.top - offset, self.left)
+        with self._profile('position_lines', 'layout', lines=len(lines)):
+            prev_line: CodeLine = None
+            for line_index, line in enumerate(lines, index):
+                if line_index == 0:
+                    if not self.lines:
+                        line._position(self.top - offset, self.left)
+                    else:
+                        first_line = self.lines[0]
+                        line._position(first_line.top - offset, first_line.left)
                 else:
-                    first_line = self.lines[0]
-                    line._position(first_line.top - offset, first_line.left)
-            else:
-                if prev_line is None:
-                    prev_line = self.lines[line_index - 1]
-                line._position(prev_line.bottom - offset, prev_line.left)
-            prev_line = line
-            offset = 0
+                    if prev_line is None:
+                        prev_line = self.lines[line_index - 1]
+                    line._position(prev_line.bottom - offset, prev_line.left)
+                prev_line = line
+                offset = 0
   
     def _find_scroll_for(self, first_line: CodeLine, last_line: CodeLine = None) -> float:
         if last_line is None:
             last_line = first_line
-        threshold = first_line.height / 2
-        if first_line.top > self.top + threshold:
-            return first_line.top - self.top
-        if last_line.bottom < self.bottom - threshold:
-            return -(self.bottom - last_line.bottom)
-        return 0
+        with self._profile('find_scroll', 'layout'):
+            threshold = first_line.height / 2
+            if first_line.top > self.top + threshold:
+                return first_line.top - self.top
+            if last_line.bottom < self.bottom - threshold:
+                return -(self.bottom - last_line.bottom)
+            return 0
 
     def _animate_slide(self, offset: float, lines: list[CodeLine] = None) -> None:
         if lines is None:
+            self._fill_view(offset)
             lines = self.lines
         if not offset or not lines:
             return
         for line in lines:
-            line._animate_slide(offset)
+            self._slide_line(line, offset)
         self._play_transitions()
 
+    def _slide_line(self, line: CodeLine, offset: float, indent: int = None, prompt: str = None) -> None:
+        if self._virtualize and not self._in_view(line) and not self._in_view(line, offset):
+            line._slide_offscreen(offset, indent=indent, prompt=prompt)
+            return
+        line._reveal()
+        line._animate_slide(offset, indent=indent, prompt=prompt)
+
+    def _in_view(self, line: CodeLine, offset: float = 0) -> bool:
+        margin = self.config.virtualize_margin * (self._font_alignment.height + self.theme.line_gap)
+        return line.bottom - offset < self.top + margin and line.top - offset > self.bottom - margin
+
+    def _virtualize_lines(self) -> None:
+        if not self._virtualize:
+            return
+        for line in self.lines:
+            if line._text is not None and not self._in_view(line):
+                line._virtualize()
+
     def _animate_insert(
             self,
             insertions: dict[int, list[CodeLine]],
@@ -435,50 +806,73 @@ class CodeBlock:
             indent_level: int = None,
             indent_prompt: str = None,
             plain: bool = None,
+            morph: bool = None,
     ) -> None:
-        if replace_lines is None:
-            replace_lines = []
-        if indent_lines is None:
-            indent_lines = []
+        replace_lines = set(replace_lines or [])
+        indent_lines = set(indent_lines or [])
         if indent_level is None:
             indent_level = self.config.default_indent
         all_new_lines: list[CodeLine] = []
         offsets: dict[CodeLine, float] = collections.defaultdict(float)
         replace_with: dict[CodeLine, CodeLine] = dict.fromkeys(replace_lines)
-        first_index: int = None
+        first_index = min(insertions)
+        if replace_lines:
+            first_index = min(first_index, min(line.index for line in replace_lines))
+        cursor = first_index
+        scrolled = False
         offset = 0.0
         for index, new_lines in sorted(insertions.items()):
+            for line in self.lines[cursor:index]:
+                if line in replace_lines:
+                    offset -= line.height
             self._position_lines(new_lines, index, offset)
-            if first_index is None:
-                first_index = index
+            if not scrolled:
+                scrolled = True
                 scroll = self._find_scroll_for(new_lines[0], new_lines[-1])
                 self._animate_slide(scroll)
                 for new_line in new_lines:
                     new_line._slide(scroll)
+            cursor = index
             for old_line, new_line in zip(self.lines[index:], new_lines):
                 if old_line not in replace_lines:
                     break
                 replace_with[old_line] = new_line
                 offset -= old_line.height
+                cursor += 1
             offsets[index] = sum(new_line.height for new_line in new_lines)
             offset += offsets[index]
             all_new_lines.extend(new_lines)
+        morphed_lines: set[CodeLine] = set()
         offset = 0.0
         for index, line in enumerate(self.lines[first_index:], first_index):
             offset += offsets.get(index, 0)
             if line in replace_lines:
-                line._animate_remove(replace_with=replace_with[line])
+                new_line = replace_with[line]
+                if morph and new_line and line._animate_morph(new_line):
+                    morphed_lines.add(new_line)
+                else:
+                    line._animate_remove(replace_with=new_line)
                 offset -= line.height
                 continue
             if line in indent_lines:
                 indent, prompt = indent_level, indent_prompt
             else:
                 indent, prompt = None, None
-            line._animate_slide(offset, indent=indent, prompt=prompt)
+            self._slide_line(line, offset, indent=indent, prompt=prompt)
         self._play_transitions()
-        for line in all_new_lines:
-            line._animate_insert(plain=plain)
+        typed_lines = [line for line in all_new_lines if line not in morphed_lines]
+        if self.config.batch_typing and not plain:
+            self._animate_typing(typed_lines)
+        else:
+            for line in typed_lines:
+                line._animate_insert(plain=plain)
         self._play_transitions()
+
+    def _animate_typing(self, lines: list[CodeLine]) -> None:
+        animations = [animation for line in lines for animation in line._typing_animations()]
+        if animations:
+            with self._profile('play', 'play', animations=len(animations)):
+                self.scene.play(LaggedStart(*animations, lag_ratio=1))
     
     def _animate_remove(
             self,
@@ -487,9 +881,10 @@ class CodeBlock:
             dedent_level: int = None,
             dedent_prompt: str = None,
     ) -> None:
-        print(dedent_lines)
-        if dedent_lines is None:
-            dedent_lines = []
+        log('removing %d lines, dedenting %d lines', len(lines), len(dedent_lines or []))
+        self._fill_view(-sum(line.height for line in lines))
+        lines = set(lines)
+        dedent_lines = set(dedent_lines or [])
         if dedent_level is None:
             indent_level = -self.config.default_indent
         else:
@@ -504,7 +899,7 @@ class CodeBlock:
                 indent, prompt = indent_level, dedent_prompt
             else:
                 indent = prompt = None
-            line._animate_slide(offset, indent=indent, prompt=prompt)
+            self._slide_line(line, offset, indent=indent, prompt=prompt)
         self._play_transitions()
 
     @contextlib.contextmanager
@@ -513,7 +908,7 @@ class CodeBlock:
             lines = self.lines
         original_opacities = []
         for line in lines:
-            original_opacities.append(line.text.opacity)
+            original_opacities.append(line._opacity)
             line._animate_opacity(opacity)
         self._play_transitions()
         try:
@@ -526,27 +921,52 @@ class CodeBlock:
     @contextlib.contextmanager
     def _animate_highlights(self, pattern: Pattern, lines: list[CodeLine]) -> Generator[None, None, None]:
         highlights: list[Rectangle] = []
-        for line in lines:
-            for match in pattern.finditer(line.content):
-                start, end = match.start(), match.end()
-                highlight = Rectangle(
-                    height = line.height + - self.theme.line_gap + self.theme.highlight_padding,
-                    width = 0.01,
-                    fill_color = self.theme.highlight_color,
-                    fill_opacity = 1,
-                )
-                highlight.move_to([line.left, line.top + self.theme.highlight_padding / 2, 0], UL)
-                highlight.shift((start - 0.5) * self._font_alignment.space_width * RIGHT)
-                self.scene.add(highlight)
-                self._add_transition(highlight.animate.stretch_to_fit_width((end - start + 1) * self._font_alignment.space_width, about_edge=LEFT))
-                highlights.append(highlight)
-        self._play_transitions(lag=0.2)
+        widths: list[float] = []
+        space_width = self._font_alignment.space_width
+        for line, start, end in self._find_spans(pattern, lines):
+            highlight = self._acquire_highlight(line.height - self.theme.line_gap + self.theme.highlight_padding)
+            highlight.move_to([line.left, line.top + self.theme.highlight_padding / 2, 0], UL)
+            highlight.shift((start - 0.5) * space_width * RIGHT)
+            highlights.append(highlight)
+            widths.append((end - start + 1) * space_width)
+        if highlights:
+            self.scene.add(*highlights)
+            self._add_transition(Widen(*highlights, widths=widths))
+        self._play_transitions()
         try:
             yield
         finally:
-            for highlight in highlights:
-                self._add_transition(FadeOut(highlight))
+            if highlights:
+                self._add_transition(FadeOut(*highlights))
             self._play_transitions()
+            self._highlight_pool.extend(highlights)
+
+    def _find_spans(self, pattern: Pattern, lines: list[CodeLine]) -> list[tuple[CodeLine, int, int]]:
+        spans: list[tuple[CodeLine, int, int]] = []
+        for line in lines:
+            line_start = len(spans)
+            for match in pattern.finditer(line.content):
+                start, end = match.span()
+                if start >= end:
+                    continue
+                if len(spans) > line_start and start <= spans[-1][2]:
+                    spans[-1] = line, spans[-1][1], max(end, spans[-1][2])
+                else:
+                    spans.append((line, start, end))
+        return spans
+
+    def _acquire_highlight(self, height: float) -> Rectangle:
+        if not self._highlight_pool:
+            return Rectangle(
+                height = height,
+                width = 0.01,
+                fill_color = self.theme.highlight_color,
+                fill_opacity = 1,
+            )
+        highlight = self._highlight_pool.pop()
+        highlight.stretch_to_fit_height(height)
+        highlight.stretch_to_fit_width(0.01)
+        return highlight
 
 
 class Paragraph:
@@ -563,8 +983,11 @@ class Paragraph:
         self.text = new_text
 
 
+from .animations import Translate, Widen
 from .codeconfig import CodeConfig
 from .codeline import CodeLine, CodeLineGroup
 from .codescene import CodeScene
 from .fontalignment import FontAlignment
-from .syntaxhighlighter import SyntaxHighligher
\ No newline at end of file
+from .layout import LayoutText
+from .syntaxhighlighter import SyntaxHighligher
+from .textcache import TextCache
\ No newline at end of file
@@ -1,4 +1,5 @@
 from __future__ import annotations
+from typing import Pattern
 
 import re
 
@@ -7,6 +8,7 @@ from .utils import Config
 
 class CodeConfig(Config):
     debug = False
+    profile = False
     small = False
     large_width = 12
     large_height = 6
@@ -16,8 +18,19 @@ class CodeConfig(Config):
     prompts: list[str] = None
     default_indent: int = 4
     typing_speed = 0.1
+    batch_typing = False
     transition_speed = 0.5
     voiceover = False
+    cache = True
+    cache_directory: str = None
+    cache_size = 4096
+    virtualize = False
+    virtualize_margin = 5
+    headless = False
+    diff = False
+    morph_threshold = 0.5
+    _prompts: tuple[str, ...] = None
+    _patterns: tuple[str, Pattern, Pattern] = None
 
     @property
     def width(self) -> float:
@@ -29,15 +42,34 @@ class CodeConfig(Config):
     
     @property
     def prompt_pattern(self) -> str:
-        if not self.prompts:
-            return ''
-        return '|'.join(re.escape(prompt) for prompt in self.prompts)
+        return self._compile_patterns()[0]
+    
+    @property
+    def line_regex(self) -> Pattern:
+        return self._compile_patterns()[1]
+    
+    @property
+    def enclosure_regex(self) -> Pattern:
+        return self._compile_patterns()[2]
+    
+    def _compile_patterns(self) -> tuple[str, Pattern, Pattern]:
+        prompts = tuple(self.prompts or ())
+        if self._patterns is None or self._prompts != prompts:
+            prompt_pattern = '|'.join(re.escape(prompt) for prompt in prompts)
+            self._prompts = prompts
+            self._patterns = (
+                prompt_pattern,
+                re.compile(rf'^({prompt_pattern})?(\s*)(.*)$'),
+                re.compile(rf'^({prompt_pattern})(\s*)\{{\.\.\.\}}$'),
+            )
+        return self._patterns
 
     class theme(Config):
         animate = True
         font = 'Monospace'
         font_size = 20
         font_color = '#000000'
+        glyph_ranges: list[tuple[int, int]] = None
         title_font = None
         title_size = None
         title_color = None
@@ -1,18 +1,23 @@
 from __future__ import annotations
-from typing import Any, ContextManager, Pattern
+from typing import Any, ContextManager, Iterable, Pattern
 
-import re
+import difflib
+import functools
 
 from manim import (
     UL,
+    UP,
     DOWN,
     RIGHT,
     Mobject,
     Group,
+    MarkupText,
+    Animation,
     FadeIn,
     FadeOut,
     AddTextLetterByLetter,
     ReplacementTransform,
+    config as manim_config,
 )
 
 from .utils import split_lines
@@ -26,22 +31,36 @@ class CodeLine:
             content: str,
             indent: int = None,
             prompt: str = None,
-            plain: bool = None
+            plain: bool = None,
+            markup: str = None,
+            stable: bool = None,
     ):
         if indent is None:
             indent = 0
         if plain is None:
             plain = False
+        if stable is None:
+            stable = True
         self.block = block
         self.content = content
         self.indent = indent
-        self.prompt = None
+        self._prompt_string: str = None
         if not plain:
-            if block._syntax_highlighter:
+            if markup is not None:
+                content = markup
+            elif block._syntax_highlighter:
                 content = block._syntax_highlighter.highlight(content)
             if prompt:
-                self.prompt = block._create_text(prompt)
-        self.text = block._create_text(content)
+                self._prompt_string = prompt
+        self._markup = content
+        self._text: MarkupText = None
+        self._prompt: MarkupText = None
+        self._virtual_position: tuple[float, float] = None
+        self._detached = False
+        self._opacity = 1.0
+        self._index: int = None
+        self._stable = stable
+        self._plain = plain
         self._stash: dict[str, Any] = {}
     
     def __repr__(self):
@@ -86,7 +105,7 @@ class CodeLine:
         return context
  
     def __floordiv__(self, enclosure: str) -> list[CodeLine]:
-        before, after, prompt, indent = split_enclosure(self.block.config.prompt_pattern, enclosure)
+        before, after, prompt, indent = split_enclosure(self.block.config.enclosure_regex, enclosure)
         lines = self.enclose(
             before = before,
             after = after,
@@ -109,20 +128,48 @@ class CodeLine:
     
     @classmethod
     def parse(cls, block: CodeBlock, line: str, plain: bool = None) -> CodeLine:
-        prompt, whitespace, content = re.match(f'^({block.config.prompt_pattern})?(\s*)(.*)$', line).groups()
+        prompt, indent, content = cls.split(block, line)
         return cls(
             block = block,
             content = content,
             prompt = prompt,
-            indent = len(whitespace),
+            indent = indent,
             plain = plain,
         )
+    
+    @classmethod
+    def split(cls, block: CodeBlock, line: str) -> tuple[str, int, str]:
+        prompt, whitespace, content = block.config.line_regex.match(line).groups()
+        return prompt, len(whitespace), content
+    
+    @classmethod
+    def split_all(cls, block: CodeBlock, lines: Iterable[str]) -> list[tuple[str, int, str]]:
+        match = block.config.line_regex.match
+        output: list[tuple[str, int, str]] = []
+        for line in lines:
+            prompt, whitespace, content = match(line).groups()
+            output.append((prompt, len(whitespace), content))
+        return output
+
+    @property
+    def text(self) -> MarkupText:
+        if self._text is None:
+            self._materialize()
+        return self._text
+    
+    @property
+    def prompt(self) -> None|MarkupText:
+        if self._prompt_string is None:
+            return None
+        if self._prompt is None:
+            self._materialize()
+        return self._prompt
 
     @property
     def string(self) -> str:
         output: list[str] = []
-        if self.prompt:
-            output.append(self.prompt.text)
+        if self._prompt_string:
+            output.append(self._prompt_string)
         if self.indent:
             output.append(' ' * self.indent)
         output.append(self.content)
@@ -130,28 +177,28 @@ class CodeLine:
     
     @property
     def index(self) -> None|int:
-        try:
-            return self.block.lines.index(self)
-        except ValueError:
-            return None
+        return self.block._index_of(self)
         
-    @property
+    @functools.cached_property
     def top(self) -> float:
+        if self._virtual_position is not None:
+            return self._virtual_position[0]
         return self.text.get_top()[1] + self.block._font_alignment.top_margin(self.content)
     
-    @property
+    @functools.cached_property
     def left(self) -> float:
-        if self.prompt:
-            mobject = self.prompt
-        else:
-            mobject = self.text
-        return mobject.get_left()[0] - self.block._font_alignment.left_margin(mobject.text)
+        if self._virtual_position is not None:
+            return self._virtual_position[1]
+        if self._prompt_string:
+            _, left_margin, _ = self.block._font_alignment.prompt_margins(self._prompt_string)
+            return self.prompt.get_left()[0] - left_margin
+        return self.text.get_left()[0] - self.block._font_alignment.left_margin(self.text.text)
     
     @property
     def bottom(self) -> float:
         return self.top - self.block._font_alignment.height - self.block.theme.line_gap
     
-    @property
+    @functools.cached_property
     def right(self) -> float:
         return self.text.get_right()[0] + self.block._font_alignment.right_margin(self.text.text)
 
@@ -232,6 +279,7 @@ class CodeLine:
             indent_level: int = None,
             indent_prompt: str = None,
             plain: bool = None,
+            diff: bool = None,
     ) -> list[CodeLine]:
         return self.block.replace_lines(
             [self],
@@ -240,6 +288,7 @@ class CodeLine:
             indent_level = indent_level,
             indent_prompt = indent_prompt,
             plain = plain,
+            diff = diff,
         )
     
     def enclose(
@@ -268,19 +317,50 @@ class CodeLine:
     
     @property
     def _mobject(self) -> Mobject:
-        if self.prompt is None:
+        if self._prompt_string is None:
             return self.text
         return Group(self.prompt, self.text)
     
+    @property
+    def _mobjects(self) -> list[Mobject]:
+        if self._prompt_string is None:
+            return [self.text]
+        return [self.prompt, self.text]
+    
+    def _materialize(self) -> None:
+        self._text = self.block._create_text(self._markup)
+        if self._prompt_string:
+            self._prompt = self.block._create_prompt(self._prompt_string)
+        if self._virtual_position is not None:
+            top, left = self._virtual_position
+            self._virtual_position = None
+            self._position(top, left)
+            if self._opacity != 1:
+                self._mobject.set_opacity(self._opacity)
+    
+    def _virtualize(self) -> None:
+        if self._text is None:
+            return
+        self._virtual_position = self.top, self.left
+        if not self._detached:
+            self.block.scene.remove(*self._mobjects)
+        self._text = self._prompt = None
+        self._detached = True
+        self._invalidate_geometry()
+    
+    def _reveal(self) -> None:
+        if self._detached:
+            self.block.scene.add(*self._mobjects)
+            self._detached = False
+    
     def _position(self, top: float, left: float) -> None:
-        if self.prompt:
-            prompt_top = top - self.block._font_alignment.top_margin(self.prompt.text)
-            prompt_left = left + self.block._font_alignment.left_margin(self.prompt.text)
-            self.prompt.move_to([prompt_left, prompt_top, 0], UL)
+        if self._prompt_string:
+            top_margin, left_margin, right_margin = self.block._font_alignment.prompt_margins(self._prompt_string)
+            self.prompt.move_to([left + left_margin, top - top_margin, 0], UL)
             text_top = top - self.block._font_alignment.top_margin(self.content)
             text_left = (
                 self.prompt.get_right()[0]
-                + self.block._font_alignment.right_margin(self.prompt.text)
+                + right_margin
                 + self.block._font_alignment.space_width * (self.indent + 1)
                 + self.block._font_alignment.left_margin(self.content)
             )
@@ -289,26 +369,96 @@ class CodeLine:
             text_top = top - self.block._font_alignment.top_margin(self.content)
             text_left = left + self.block._font_alignment.left_margin(self.content)
             self.text.move_to([text_left, text_top, 0], UL)
+        self._invalidate_geometry()
 
     def _slide(self, offset: float):
-        self._mobject.shift(offset * DOWN)
+        if self._virtual_position is not None:
+            top, left = self._virtual_position
+            self._virtual_position = top - offset, left
+        else:
+            self._mobject.shift(offset * DOWN)
+        self._invalidate_geometry()
+    
+    def _slide_offscreen(
+            self,
+            offset: float,
+            indent: int = None,
+            prompt: str = None,
+    ) -> None:
+        if indent is None:
+            indent = 0
+        self._virtualize()
+        top, left = self._virtual_position
+        if not self._prompt_string:
+            left += self.block._font_alignment.space_width * indent
+        elif prompt:
+            self._prompt_string = prompt
+        self._virtual_position = top - offset, left
+        self.indent += indent
+        self._invalidate_geometry()
+    
+    def _invalidate_geometry(self) -> None:
+        for name in ('top', 'left', 'right'):
+            self.__dict__.pop(name, None)
     
     def _animate_insert(self, plain: bool = None) -> None:
         if plain:
             self.block._add_transition(FadeIn(self._mobject))
         else:
-            if self.prompt:
+            if self._prompt_string:
                 self.block.scene.add(self.prompt)
-            self.block.scene.play(AddTextLetterByLetter(self.text), run_time=self.typing_duration)
+            with self.block._profile('play', 'play', animations=1):
+                self.block.scene.play(AddTextLetterByLetter(self.text), run_time=self.typing_duration)
+
+    def _typing_animations(self) -> list[Animation]:
+        animations: list[Animation] = []
+        if self._prompt_string:
+            animations.append(FadeIn(self.prompt, run_time=1 / manim_config.frame_rate))
+        animations.append(AddTextLetterByLetter(self.text, run_time=self.typing_duration))
+        return animations
+
+    def _animate_morph(self, replace_with: CodeLine) -> bool:
+        if self._detached or self._prompt_string != replace_with._prompt_string:
+            return False
+        matches = self._match_glyphs(replace_with)
+        if matches is None:
+            return False
+        if self._prompt_string:
+            self._hand_over_prompt(replace_with)
+        self.block._add_transition(MorphText(self.text, replace_with.text, matches))
+        return True
+
+    def _match_glyphs(self, line: CodeLine) -> None|list[tuple[int, int]]:
+        chars, new_chars = ''.join(self.content.split()), ''.join(line.content.split())
+        if len(self.text.submobjects) != len(chars) or len(line.text.submobjects) != len(new_chars):
+            return None
+        matcher = difflib.SequenceMatcher(None, chars, new_chars, autojunk=False)
+        if matcher.ratio() < self.block.config.morph_threshold:
+            return None
+        return [
+            (start + offset, new_start + offset)
+            for start, new_start, size in matcher.get_matching_blocks()
+            for offset in range(size)
+        ]
 
     def _animate_remove(self, replace_with: CodeLine=None) -> None:
-        if replace_with and self.prompt and replace_with.prompt and self.prompt.text == replace_with.prompt.text:
-            replace_with.prompt = self.prompt
+        if self._detached:
+            return
+        if replace_with and self._prompt_string and self._prompt_string == replace_with._prompt_string:
+            self._hand_over_prompt(replace_with)
             mobject = self.text
         else:
             mobject = self._mobject
         self.block._add_transition(FadeOut(mobject))
     
+    def _hand_over_prompt(self, line: CodeLine) -> None:
+        vector = (line.left - self.left) * RIGHT + (line.top - self.top) * UP
+        line._prompt = self.prompt
+        line._invalidate_geometry()
+        if vector.any():
+            self.block._add_shift(line._prompt, vector)
+            self.block._moving_lines.add(line)
+    
     def _animate_slide(
             self,
             offset: float,
@@ -319,20 +469,41 @@ class CodeLine:
             indent = 0
         down = offset * DOWN
         right = self.block._font_alignment.space_width * indent * RIGHT
-        self.block._add_transition(self.text.animate.shift(down + right))
-        if self.prompt:
-            if prompt and prompt != self.prompt.text:
-                new_prompt = self.block._create_text(prompt)
-                top = self.top - self.block._font_alignment.top_margin(prompt) - offset
-                left = self.left + self.block._font_alignment.left_margin(prompt)
-                new_prompt.move_to([left, top, 0], UL)
+        self.block._add_shift(self.text, down + right)
+        if self._prompt_string:
+            if prompt and prompt != self._prompt_string:
+                new_prompt = self.block._create_prompt(prompt)
+                top_margin, left_margin, _ = self.block._font_alignment.prompt_margins(prompt)
+                new_prompt.move_to([self.left + left_margin, self.top - top_margin - offset, 0], UL)
                 self.block._add_transition(ReplacementTransform(self.prompt, new_prompt))
-                self.prompt = new_prompt
+                self._prompt = new_prompt
+                self._prompt_string = prompt
             else:
-                self.block._add_transition(self.prompt.animate.shift(down))
+                self.block._add_shift(self.prompt, down)
         self.indent += indent
+        self._invalidate_geometry()
+        self.block._moving_lines.add(self)
+
+    def _animate_recolor(self, markup: str, stable: bool) -> None:
+        self._markup = markup
+        self._stable = stable
+        if self._text is None:
+            return
+        text = self.block._create_text(markup)
+        text.move_to(self._text.get_corner(UL), UL)
+        if self._opacity != 1:
+            text.set_opacity(self._opacity)
+        if not self._detached:
+            self.block._add_transition(ReplacementTransform(self._text, text))
+        self._text = text
+        self._invalidate_geometry()
 
     def _animate_opacity(self, opacity: float) -> None:
+        self._opacity = opacity
+        if self._detached:
+            if self._text is not None:
+                self._mobject.set_opacity(opacity)
+            return
         self.block._add_transition(self._mobject.animate.set_opacity(opacity))
 
 
@@ -385,7 +556,7 @@ class CodeLineGroup:
         return context
     
     def __floordiv__(self, enclosure: str) -> list[CodeLine]:
-        before, after, prompt, indent = split_enclosure(self.block.config.prompt_pattern, enclosure)
+        before, after, prompt, indent = split_enclosure(self.block.config.enclosure_regex, enclosure)
         lines = self.enclose(
             before = before,
             after = after,
@@ -429,6 +600,7 @@ class CodeLineGroup:
             indent_level: int = None,
             indent_prompt: str = None,
             plain: bool = None,
+            diff: bool = None,
     ) -> list[CodeLine]:
         return self.block.replace_lines(
             self.lines,
@@ -437,6 +609,7 @@ class CodeLineGroup:
             indent_level = indent_level,
             indent_prompt = indent_prompt,
             plain = plain,
+            diff = diff,
         )
     
     def enclose(
@@ -464,15 +637,14 @@ class CodeLineGroup:
             return self.block.highlight_lines(self.lines)
     
 
-def split_enclosure(prompt_pattern: str, string: str) -> tuple[str, str, str, int]:
-    enclosure_pattern = re.compile(rf'^({prompt_pattern})(\s*)\{{\.\.\.\}}$')
+def split_enclosure(enclosure_regex: Pattern, string: str) -> tuple[str, str, str, int]:
     before: list[CodeLine] = []
     after: list[CodeLine] = []
     prompt: str = None
     indent: int = None
     lines = before
     for line in split_lines(string):
-        match = enclosure_pattern.match(line)
+        match = enclosure_regex.match(line)
         if match:
             prompt, whitespace = match.groups()
             indent = len(whitespace)
@@ -482,4 +654,5 @@ def split_enclosure(prompt_pattern: str, string: str) -> tuple[str, str, str, in
     return '\n'.join(before), '\n'.join(after), prompt, indent
 
 
+from .animations import MorphText
 from .codeblock import CodeBlock
\ No newline at end of file
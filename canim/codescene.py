@@ -1,7 +1,20 @@
 from __future__ import annotations
 from typing import Any, Callable
 
+import pathlib
+import subprocess
+
+from manim import Animation, Mobject, config as manim_config
+from manim.camera.camera import Camera
+from manim.renderer import cairo_renderer
+from manim.renderer.cairo_renderer import CairoRenderer
+from manim.utils.hashing import get_hash_from_play_call
+from manim.utils.file_ops import is_gif_format, is_mov_format, is_png_format, is_webm_format, write_to_movie
 from manim_voiceover import VoiceoverScene
+from PIL import Image
+
+from .fingerprint import UnstableFingerprint, chain_fingerprint, fingerprint_play
+from .utils import log
 
 
 def code_animation(function: Callable) -> Callable:
@@ -13,6 +26,19 @@ def code_animation(function: Callable) -> Callable:
 
 class CodeScene(VoiceoverScene):
 
+    collapse_static_frames = False
+    fingerprint_plays = False
+    profiler: Profiler = None
+    _fingerprint = ''
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        if self.collapse_static_frames:
+            if isinstance(self.renderer, CairoRenderer):
+                self.renderer.freeze_current_frame = self._freeze_current_frame
+            else:
+                log('collapse_static_frames disabled: %s is not supported', type(self.renderer).__name__)
+
     def __repr__(self):
         return f'<code scene {self.__class__.__name__!r}>'
     
@@ -20,7 +46,94 @@ class CodeScene(VoiceoverScene):
         if config_obj is None:
             config_obj = CodeConfig(**config)
         return CodeBlock(self, config_obj)
+    
+    def play(self, *args: Any, **kwargs: Any) -> None:
+        if not self._fingerprinting:
+            return super().play(*args, **kwargs)
+        cairo_renderer.get_hash_from_play_call = self._fingerprint_play
+        try:
+            return super().play(*args, **kwargs)
+        finally:
+            cairo_renderer.get_hash_from_play_call = get_hash_from_play_call
+
+    def compile_animation_data(self, *animations: Any, **play_kwargs: Any) -> None|CodeScene:
+        result = super().compile_animation_data(*animations, **play_kwargs)
+        if self._fingerprinting:
+            self._advance_fingerprint()
+        return result
+    
+    @property
+    def _fingerprinting(self) -> bool:
+        return self.fingerprint_plays and isinstance(self.renderer, CairoRenderer) and not manim_config.disable_caching
+
+    def tear_down(self) -> None:
+        super().tear_down()
+        if self.profiler is not None:
+            name = self.__class__.__name__
+            log('%s', self.profiler.report(name))
+            report_path, trace_path = self.profiler.dump(pathlib.Path(manim_config.media_dir) / 'canim' / 'profiles', name)
+            log('profile written to %s and %s', report_path, trace_path)
+
+    def _advance_fingerprint(self) -> None:
+        camera = self.renderer.camera
+        try:
+            self._fingerprint = fingerprint_play(self._fingerprint, camera, self.animations, self.mobjects)
+        except UnstableFingerprint as error:
+            log('falling back to manim hashing: %s', error)
+            manim_hash = get_hash_from_play_call(self, camera, self.animations, self.mobjects)
+            self._fingerprint = chain_fingerprint(self._fingerprint, manim_hash)
+
+    def _fingerprint_play(self, scene: CodeScene, camera: Camera, animations: list[Animation], mobjects: list[Mobject]) -> str:
+        return self._fingerprint
+
+    def _freeze_current_frame(self, duration: float) -> None:
+        renderer: CairoRenderer = self.renderer
+        file_writer = renderer.file_writer
+        frame_rate = renderer.camera.frame_rate
+        num_frames = int(duration * frame_rate)
+        if (
+            renderer.skip_animations
+            or num_frames <= 1
+            or not write_to_movie()
+            or is_gif_format() or is_mov_format() or is_png_format() or is_webm_format()
+            or manim_config.transparent
+        ):
+            CairoRenderer.freeze_current_frame(renderer, duration)
+            return
+        if not hasattr(file_writer, 'writing_process'):
+            log('collapse_static_frames disabled: the file writer has no ffmpeg pipe')
+            del renderer.freeze_current_frame
+            CairoRenderer.freeze_current_frame(renderer, duration)
+            return
+        file_writer.writing_process.stdin.close()
+        file_writer.writing_process.wait()
+        movie_path = pathlib.Path(file_writer.partial_movie_file_path)
+        frame_path = movie_path.with_suffix('.png')
+        Image.fromarray(renderer.get_frame()).save(frame_path)
+        try:
+            subprocess.run(
+                [
+                    manim_config.ffmpeg_executable,
+                    '-y',
+                    '-loglevel', manim_config.ffmpeg_loglevel.lower(),
+                    '-loop', '1',
+                    '-framerate', str(int(frame_rate) if frame_rate == int(frame_rate) else frame_rate),
+                    '-i', str(frame_path),
+                    '-frames:v', str(num_frames),
+                    '-an',
+                    '-vcodec', 'libx264',
+                    '-tune', 'stillimage',
+                    '-pix_fmt', 'yuv420p',
+                    str(movie_path),
+                ],
+                check = True,
+            )
+        finally:
+            frame_path.unlink()
+        renderer.time += num_frames / frame_rate
+        log('collapsed %d static frames into %s', num_frames, movie_path.name)
 
 
 from .codeblock import CodeBlock
-from .codeconfig import CodeConfig
\ No newline at end of file
+from .codeconfig import CodeConfig
+from .profiler import Profiler
\ No newline at end of file
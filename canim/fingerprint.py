@@ -0,0 +1,134 @@
+from __future__ import annotations
+from typing import Any, Iterable
+
+import functools
+import hashlib
+import types
+
+import numpy as np
+from manim import Animation, Mobject, VMobject
+from manim.camera.camera import Camera
+
+
+precision = 4
+
+
+class UnstableFingerprint(Exception):
+    pass
+
+
+def fingerprint_play(
+        previous: str,
+        camera: Camera,
+        animations: Iterable[Animation],
+        mobjects: Iterable[Mobject],
+) -> str:
+    digest = hashlib.sha256(previous.encode())
+    _update(digest, (
+        camera.pixel_width,
+        camera.pixel_height,
+        camera.frame_rate,
+        str(camera.background_color),
+        camera.background_opacity,
+    ))
+    for animation in animations:
+        _update_animation(digest, animation)
+    digest.update(b'|')
+    for mobject in mobjects:
+        _update_mobject(digest, mobject)
+    return f'canim_{digest.hexdigest()[:32]}'
+
+
+def chain_fingerprint(previous: str, value: str) -> str:
+    digest = hashlib.sha256(previous.encode())
+    digest.update(value.encode())
+    return f'canim_{digest.hexdigest()[:32]}'
+
+
+def _update_animation(digest: Any, animation: Animation) -> None:
+    digest.update(type(animation).__name__.encode())
+    for key, value in sorted(vars(animation).items()):
+        if key == 'starting_mobject':
+            continue
+        digest.update(key.encode())
+        _update(digest, value)
+
+
+def _update_mobject(digest: Any, mobject: Mobject) -> None:
+    for member in mobject.get_family():
+        digest.update(type(member).__name__.encode())
+        digest.update(_round(member.points).tobytes())
+        digest.update(repr(member.z_index).encode())
+        if isinstance(member, VMobject):
+            digest.update(_round(member.fill_rgbas).tobytes())
+            digest.update(_round(member.stroke_rgbas).tobytes())
+            digest.update(repr(member.stroke_width).encode())
+        else:
+            digest.update(str(member.color).encode())
+            pixel_array = getattr(member, 'pixel_array', None)
+            if pixel_array is not None:
+                digest.update(np.asarray(pixel_array).tobytes())
+
+
+def _update(digest: Any, value: Any) -> None:
+    if isinstance(value, Animation):
+        _update_animation(digest, value)
+    elif isinstance(value, Mobject):
+        _update_mobject(digest, value)
+    elif isinstance(value, np.ndarray):
+        if value.dtype.kind in 'fc':
+            value = _round(value)
+        digest.update(value.tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(b'[')
+        for item in value:
+            _update(digest, item)
+        digest.update(b']')
+    elif isinstance(value, dict):
+        digest.update(b'{')
+        for key, item in value.items():
+            _update(digest, key)
+            _update(digest, item)
+        digest.update(b'}')
+    elif isinstance(value, (set, frozenset)):
+        digest.update(b'(')
+        for item in sorted(value, key=repr):
+            _update(digest, item)
+        digest.update(b')')
+    elif isinstance(value, np.generic):
+        _update(digest, value.item())
+    elif isinstance(value, float):
+        digest.update(repr(round(value, precision) + 0.0).encode())
+    elif value is None or isinstance(value, (bool, int, str, bytes)):
+        digest.update(repr(value).encode())
+    elif isinstance(value, types.CodeType):
+        digest.update(value.co_code)
+        _update(digest, value.co_consts)
+        _update(digest, value.co_names)
+    elif isinstance(value, types.FunctionType):
+        digest.update(f'{value.__module__}.{value.__qualname__}'.encode())
+        _update(digest, value.__code__)
+        _update(digest, value.__defaults__)
+        _update(digest, value.__kwdefaults__)
+        for cell in value.__closure__ or ():
+            contents = cell.cell_contents
+            if isinstance(contents, types.FunctionType):
+                digest.update(contents.__qualname__.encode())
+            else:
+                _update(digest, contents)
+    elif isinstance(value, types.MethodType):
+        _update(digest, value.__func__)
+        _update(digest, value.__self__)
+    elif isinstance(value, functools.partial):
+        _update(digest, value.func)
+        _update(digest, value.args)
+        _update(digest, value.keywords)
+    else:
+        text = repr(value)
+        if ' at 0x' in text:
+            raise UnstableFingerprint(f'{type(value).__qualname__} has no stable representation')
+        digest.update(f'{type(value).__qualname__}:{text}'.encode())
+
+
+def _round(array: np.ndarray) -> np.ndarray:
+    return np.round(array, precision) + 0.0
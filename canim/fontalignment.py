@@ -1,60 +1,163 @@
-import textwrap
+import hashlib
+import html
+import os
+import pathlib
+import re
 
+import numpy as np
 from manim import Text
+from manim.mobject.text.text_mobject import TEXT_MOB_SCALE_FACTOR, TEXT2SVG_ADJUSTMENT_FACTOR
 from matplotlib import font_manager
 from PIL import ImageFont
 
+from .utils import tag_regex
+
+
+printable_ascii = 0x20, 0x7f
+nominal_ratio = TEXT_MOB_SCALE_FACTOR / TEXT2SVG_ADJUSTMENT_FACTOR
+word_regex = re.compile(r'(?:<[^>]*>|[^\s<])+')
+
 
 class FontAlignment:
-    
+
+    version = 1
+
     def __init__(
             self,
             font: str,
             font_size: int,
             paragraph_font: str = None,
             paragraph_size: int = None,
+            glyph_ranges: list[tuple[int, int]] = None,
+            cache_directory: str|pathlib.Path = None,
+            headless: bool = False,
     ):
         self.font = font
         self.font_size = font_size
         self.paragraph_font = paragraph_font or font
         self.paragraph_size = paragraph_size or font_size
-        self.space_width = Text('_' * 100, font=self.font, font_size=self.font_size).width / 100
-        self._font = self._load_font(self.font, self.font_size)
+        self.glyph_ranges = [printable_ascii, *(glyph_ranges or [])]
+        self.headless = headless
+        self._font_path = font_manager.findfont(self.font)
+        self._font = ImageFont.truetype(self._font_path, self.font_size)
         self._paragraph_font = self._load_font(self.paragraph_font, self.paragraph_size)
+        self._glyph_margins: dict[str, tuple[float, float, float]] = {}
         self._top_margins: dict[str, float] = {}
-        self._left_margins: dict[str, float] = {}
-        x = Text('x', font=self.font, font_size=self.font_size)
-        _, top, _, bottom = self._font.getbbox('x')
-        self._ratio = x.height / (bottom - top)
-        self.height = x.height + self._ratio * top
-        
+        self._prompt_margins: dict[str, tuple[float, float, float]] = {}
+        self._word_widths: dict[str, float] = {}
+        self._paragraphs: dict[tuple[str, float], str] = {}
+        self._load_metrics(pathlib.Path(cache_directory) if cache_directory else None)
+
     def top_margin(self, string: str) -> float:
-        string = string.replace(' ', '')
-        for char in string:
-            if char not in self._top_margins:
-                _, top, _, _ = self._font.getbbox(char)
-                self._top_margins[char] = self._ratio * top
-        margin = min(self._top_margins[char] for char in string)
+        margin = self._top_margins.get(string)
+        if margin is None:
+            margin = self._top_margins[string] = self._top_margin(string)
         return margin
 
     def left_margin(self, string: str) -> float:
-        return self._horizontal_margin(string.strip()[0])
+        return self._margins_of(string.strip()[0])[1]
 
     def right_margin(self, string: str) -> float:
-        return self._horizontal_margin(string.strip()[-1])
-    
+        return self._margins_of(string.strip()[-1])[2]
+
+    def prompt_margins(self, prompt: str) -> tuple[float, float, float]:
+        margins = self._prompt_margins.get(prompt)
+        if margins is None:
+            margins = self._prompt_margins[prompt] = self.top_margin(prompt), self.left_margin(prompt), self.right_margin(prompt)
+        return margins
+
     def wrap_paragraph(self, width: float, text: str) -> str:
-        output: list[str] = []
-        for line in text.splitlines():
-            average = Text(line, font=self.paragraph_font, font_size=self.paragraph_size).width / len(line)
-            output.append(textwrap.fill(line, int(width / average)))
-        return '\n'.join(output)
-    
+        key = text, width
+        paragraph = self._paragraphs.get(key)
+        if paragraph is None:
+            paragraph = self._paragraphs[key] = '\n'.join(self._wrap_line(width, line) for line in text.splitlines())
+        return paragraph
+
+    def _wrap_line(self, width: float, line: str) -> str:
+        space_width = self._word_width(' ')
+        lines: list[str] = []
+        words: list[str] = []
+        line_width = 0.0
+        for word in word_regex.findall(line):
+            word_width = self._word_width(word)
+            if words and line_width + space_width + word_width > width:
+                lines.append(' '.join(words))
+                words.clear()
+            line_width = line_width + space_width + word_width if words else word_width
+            words.append(word)
+        if words:
+            lines.append(' '.join(words))
+        return '\n'.join(lines)
+
+    def _word_width(self, word: str) -> float:
+        word_width = self._word_widths.get(word)
+        if word_width is None:
+            visible = html.unescape(tag_regex.sub('', word))
+            word_width = self._word_widths[word] = self._ratio * self._paragraph_font.getlength(visible)
+        return word_width
+
     def _load_font(self, font: str, font_size: int) -> ImageFont.FreeTypeFont:
         return ImageFont.truetype(font_manager.findfont(font), font_size)
 
-    def _horizontal_margin(self, char: str) -> float:
-        if char not in self._left_margins:
-            text = Text(char, font=self.font, font_size=self.font_size)
-            self._left_margins[char] = self.space_width - text.width
-        return self._left_margins[char] / 2
\ No newline at end of file
+    def _load_metrics(self, directory: pathlib.Path = None) -> None:
+        path = None
+        if directory:
+            stat = os.stat(self._font_path)
+            key = self.version, self._font_path, stat.st_size, stat.st_mtime_ns, self.font_size, self.glyph_ranges
+            path = directory / f'{hashlib.sha256(repr(key).encode()).hexdigest()}.npz'
+            if path.exists():
+                try:
+                    with np.load(path, allow_pickle=False) as metrics:
+                        self._ratio, self.height, self.space_width = metrics['scalars'].tolist()
+                        self._margins = metrics['margins']
+                    return
+                except (OSError, ValueError, KeyError):
+                    pass
+        _, top, _, bottom = self._ink_bbox('x')
+        if self.headless:
+            self._ratio = nominal_ratio
+        else:
+            x = Text('x', font=self.font, font_size=self.font_size)
+            self._ratio = x.height / (bottom - top)
+        self.height = self._ratio * bottom
+        self.space_width = self._ratio * self._font.getlength('_')
+        self._margins = np.full((3, max(end for _, end in self.glyph_ranges)), np.nan)
+        for start, end in self.glyph_ranges:
+            for codepoint in range(start, end):
+                self._margins[:, codepoint] = self._measure(chr(codepoint))
+        if path and not self.headless:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temporary_path = path.with_suffix(f'.{os.getpid()}.tmp')
+            with open(temporary_path, 'wb') as writer:
+                np.savez(writer, scalars=np.array([self._ratio, self.height, self.space_width]), margins=self._margins)
+            os.replace(temporary_path, path)
+
+    def _measure(self, char: str) -> tuple[float, float, float]:
+        left, top, right, _ = self._ink_bbox(char)
+        advance = self._font.getlength(char)
+        return self._ratio * top, self._ratio * left, self._ratio * (advance - right)
+
+    def _ink_bbox(self, char: str) -> tuple[int, int, int, int]:
+        mask, (x, y) = self._font.getmask2(char)
+        bbox = mask.getbbox()
+        if not bbox:
+            return self._font.getbbox(char)
+        left, top, right, bottom = bbox
+        return x + left, y + top, x + right, y + bottom
+
+    def _top_margin(self, string: str) -> float:
+        codepoints = np.frombuffer(string.encode('utf-32-le'), dtype=np.uint32)
+        codepoints = codepoints[codepoints != ord(' ')]
+        if codepoints.size and codepoints.max() < self._margins.shape[1]:
+            margins = self._margins[0, codepoints]
+            if not np.isnan(margins).any():
+                return float(margins.min())
+        return min(self._margins_of(char)[0] for char in string.replace(' ', ''))
+
+    def _margins_of(self, char: str) -> tuple[float, float, float]:
+        codepoint = ord(char)
+        if codepoint < self._margins.shape[1] and not np.isnan(self._margins[0, codepoint]):
+            return self._margins[:, codepoint]
+        if char not in self._glyph_margins:
+            self._glyph_margins[char] = self._measure(char)
+        return self._glyph_margins[char]
@@ -0,0 +1,153 @@
+from __future__ import annotations
+from typing import Any, Generator
+
+import contextlib
+import html
+import types
+
+from manim import Animation, Mobject, VMobject, VGroup
+from manim.animation.animation import prepare_animation
+
+from .utils import tag_regex
+
+
+class LayoutText(VGroup):
+
+    def __init__(
+            self,
+            content: str,
+            font_alignment: FontAlignment,
+            font_size: float = None,
+            color: str = None,
+    ):
+        super().__init__()
+        self.original_text = content
+        self.text = content.replace(' ', '').replace('\n', '')
+        scale = (font_size or font_alignment.font_size) / font_alignment.font_size
+        height = font_alignment.height * scale
+        advance = font_alignment.space_width * scale
+        glyphs: list[VMobject] = []
+        for row, line in enumerate(html.unescape(tag_regex.sub('', content)).split('\n')):
+            baseline = -row * height
+            for column, char in enumerate(line):
+                if char.isspace():
+                    continue
+                top, left, right = (margin * scale for margin in font_alignment._margins_of(char))
+                glyph_left = column * advance + left
+                glyph_right = max((column + 1) * advance - right, glyph_left)
+                glyph_top = baseline - top
+                glyph_bottom = baseline - height
+                glyph = VMobject(fill_color=color, fill_opacity=1, stroke_width=0)
+                glyph.set_points_as_corners([
+                    [glyph_left, glyph_top, 0],
+                    [glyph_right, glyph_top, 0],
+                    [glyph_right, glyph_bottom, 0],
+                    [glyph_left, glyph_bottom, 0],
+                    [glyph_left, glyph_top, 0],
+                ])
+                glyphs.append(glyph)
+        self.add(*glyphs)
+
+    def __repr__(self):
+        return f'LayoutText({self.original_text!r})'
+
+
+class LayoutEvent:
+
+    def __init__(self, kind: str, start: float, duration: float, animations: list[str] = None, name: str = None):
+        self.kind = kind
+        self.start = start
+        self.duration = duration
+        self.animations = animations or []
+        self.name = name
+
+    def __repr__(self):
+        description = self.name or ', '.join(self.animations)
+        return f'<{self.kind} at {self.start:.2f}s for {self.duration:.2f}s: {description}>'
+
+    @property
+    def end(self) -> float:
+        return self.start + self.duration
+
+
+class LayoutScene:
+
+    def __init__(self):
+        self.camera = types.SimpleNamespace(background_color=None)
+        self.mobjects: list[Mobject] = []
+        self.timeline: list[LayoutEvent] = []
+        self.time = 0.0
+        self.profiler: Profiler = None
+
+    def __repr__(self):
+        return f'<layout scene: {len(self.timeline)} events, {self.time:.2f}s>'
+
+    @classmethod
+    def run(cls, scene_class: type[CodeScene]) -> LayoutScene:
+        scene = cls()
+        scene_class.construct(scene)
+        return scene
+
+    def code(self, config_obj: CodeConfig = None, **config: Any) -> CodeBlock:
+        if config_obj is None:
+            config_obj = CodeConfig(**config)
+        else:
+            config_obj = config_obj.copy()
+        config_obj.headless = True
+        return CodeBlock(self, config_obj)
+
+    def add(self, *mobjects: Mobject) -> None:
+        for mobject in mobjects:
+            if mobject not in self.mobjects:
+                self.mobjects.append(mobject)
+
+    def remove(self, *mobjects: Mobject) -> None:
+        removed = set(mobjects)
+        self.mobjects = [mobject for mobject in self.mobjects if mobject not in removed]
+
+    def get_mobject_family_members(self) -> list[Mobject]:
+        return [member for mobject in self.mobjects for member in mobject.get_family()]
+
+    def play(self, *animations: Animation, run_time: float = None, **kwargs: Any) -> None:
+        animations = [prepare_animation(animation) for animation in animations]
+        for animation in animations:
+            if run_time is not None:
+                animation.run_time = run_time
+            for key, value in kwargs.items():
+                setattr(animation, key, value)
+        for animation in animations:
+            animation._setup_scene(self)
+            animation.begin()
+            animation.finish()
+            animation.clean_up_from_scene(self)
+        duration = max(animation.run_time for animation in animations)
+        self._record('play', duration, animations=[type(animation).__name__ for animation in animations])
+
+    def wait(self, duration: float = 1.0, **kwargs: Any) -> None:
+        self._record('wait', duration)
+
+    def next_section(self, name: str = 'unnamed', **kwargs: Any) -> None:
+        self._record('section', 0, name=name)
+
+    def set_speech_service(self, speech_service: Any) -> None:
+        pass
+
+    @contextlib.contextmanager
+    def voiceover(self, text: str = None, **kwargs: Any) -> Generator[None, None, None]:
+        start = self.time
+        yield None
+        self.timeline.append(LayoutEvent('voiceover', start, self.time - start, name=text))
+
+    def wait_until_bookmark(self, mark: str) -> None:
+        self._record('bookmark', 0, name=mark)
+
+    def _record(self, kind: str, duration: float, animations: list[str] = None, name: str = None) -> None:
+        self.timeline.append(LayoutEvent(kind, self.time, duration, animations=animations, name=name))
+        self.time += duration
+
+
+from .codeblock import CodeBlock
+from .codeconfig import CodeConfig
+from .codescene import CodeScene
+from .fontalignment import FontAlignment
+from .profiler import Profiler
@@ -0,0 +1,147 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Callable, Generator
+
+import collections
+import contextlib
+import functools
+import inspect
+import json
+import os
+import pathlib
+import time
+
+if TYPE_CHECKING:
+    from .codeblock import CodeBlock
+
+
+categories = 'text', 'highlight', 'layout', 'animation', 'play'
+
+
+class Span:
+
+    def __init__(self, name: str, category: str, start: float, depth: int, args: dict[str, Any]):
+        self.name = name
+        self.category = category
+        self.start = start
+        self.depth = depth
+        self.args = args
+        self.duration = 0.0
+        self.self_time = 0.0
+
+    def __repr__(self):
+        return f'<span {self.name} ({self.category}): {self.duration:.4f}s>'
+
+
+class Profiler:
+
+    def __init__(self):
+        self.spans: list[Span] = []
+        self._origin = time.perf_counter()
+        self._stack: list[Span] = []
+
+    def __repr__(self):
+        return f'<profiler: {len(self.spans)} spans>'
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str, **args: Any) -> Generator[Span, None, None]:
+        span = Span(name, category, time.perf_counter() - self._origin, len(self._stack), args)
+        self._stack.append(span)
+        try:
+            yield span
+        finally:
+            self._stack.pop()
+            span.duration = time.perf_counter() - self._origin - span.start
+            span.self_time += span.duration
+            if self._stack:
+                self._stack[-1].self_time -= span.duration
+            self.spans.append(span)
+
+    def context(self, context: contextlib.AbstractContextManager, name: str, category: str) -> ProfiledContext:
+        return ProfiledContext(self, context, name, category)
+
+    def totals(self) -> dict[str, float]:
+        totals = dict.fromkeys(categories, 0.0)
+        for span in self.spans:
+            totals[span.category] = totals.get(span.category, 0.0) + span.self_time
+        return totals
+
+    def operations(self) -> dict[str, tuple[int, float, int]]:
+        operations: dict[str, list[int|float]] = collections.defaultdict(lambda: [0, 0.0, 0])
+        for span in self.spans:
+            if span.depth == 0:
+                operation = operations[span.name]
+                operation[0] += 1
+                operation[1] += span.duration
+                operation[2] = max(operation[2], span.args.get('block_lines', 0))
+        return {name: tuple(operation) for name, operation in operations.items()}
+
+    def report(self, title: str = None) -> str:
+        totals = self.totals()
+        total = sum(totals.values()) or 1.0
+        output = [f'canim profile: {title}' if title else 'canim profile']
+        output.append(f'{"category":<16}{"seconds":>10}{"share":>9}')
+        for category, seconds in totals.items():
+            output.append(f'{category:<16}{seconds:>10.3f}{seconds / total:>9.1%}')
+        output.append('')
+        output.append(f'{"operation":<24}{"calls":>7}{"seconds":>10}{"block lines":>13}')
+        for name, (calls, seconds, block_lines) in sorted(self.operations().items(), key=lambda item: -item[1][1]):
+            output.append(f'{name:<24}{calls:>7}{seconds:>10.3f}{block_lines:>13}')
+        return '\n'.join(output)
+
+    def trace(self) -> dict[str, Any]:
+        pid = os.getpid()
+        return dict(
+            traceEvents = [
+                dict(
+                    name = span.name,
+                    cat = span.category,
+                    ph = 'X',
+                    ts = span.start * 1e6,
+                    dur = span.duration * 1e6,
+                    pid = pid,
+                    tid = 0,
+                    args = span.args,
+                )
+                for span in sorted(self.spans, key=lambda span: span.start)
+            ],
+            displayTimeUnit = 'ms',
+        )
+
+    def dump(self, directory: str|pathlib.Path, name: str) -> tuple[pathlib.Path, pathlib.Path]:
+        directory = pathlib.Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        report_path = directory / f'{name}.txt'
+        trace_path = directory / f'{name}.json'
+        report_path.write_text(self.report(name) + '\n')
+        trace_path.write_text(json.dumps(self.trace()))
+        return report_path, trace_path
+
+
+class ProfiledContext:
+
+    def __init__(self, profiler: Profiler, context: contextlib.AbstractContextManager, name: str, category: str):
+        self.profiler = profiler
+        self.context = context
+        self.name = name
+        self.category = category
+
+    def __enter__(self):
+        with self.profiler.span(self.name, self.category):
+            return self.context.__enter__()
+
+    def __exit__(self, exception, error, traceback):
+        with self.profiler.span(f'{self.name}:exit', self.category):
+            return self.context.__exit__(exception, error, traceback)
+
+
+def profiled(function: Callable) -> Callable:
+    is_context = inspect.isgeneratorfunction(getattr(function, '__wrapped__', None))
+    @functools.wraps(function)
+    def wrapper(block: CodeBlock, *args: Any, **kwargs: Any) -> Any:
+        if block.profiler is None:
+            return function(block, *args, **kwargs)
+        if is_context:
+            return block.profiler.context(function(block, *args, **kwargs), function.__name__, 'animation')
+        with block.profiler.span(function.__name__, 'animation', block_lines=len(block.lines)):
+            return function(block, *args, **kwargs)
+    return wrapper
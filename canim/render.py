@@ -0,0 +1,161 @@
+from __future__ import annotations
+from typing import Generator
+
+import argparse
+import concurrent.futures
+import contextlib
+import importlib.util
+import inspect
+import multiprocessing
+import os
+import pathlib
+import subprocess
+import sys
+
+from manim import Scene, tempconfig, config as manim_config
+from manim.scene.scene_file_writer import SceneFileWriter
+from manim.utils.exceptions import EndSceneEarlyException
+
+from .utils import log, set_debug
+
+
+qualities = {
+    'l': 'low_quality',
+    'm': 'medium_quality',
+    'h': 'high_quality',
+    'p': 'production_quality',
+    'k': 'fourk_quality',
+}
+next_section_parameters = ['self', 'name', 'type', 'skip_animations']
+
+
+def render(
+        path: str|pathlib.Path,
+        scene_name: str,
+        quality: str = 'l',
+        workers: int = None,
+        media_dir: str|pathlib.Path = None,
+) -> None|pathlib.Path:
+    path = pathlib.Path(path).resolve()
+    media_dir = pathlib.Path(media_dir or manim_config.media_dir).resolve()
+    options = dict(
+        input_file = str(path),
+        quality = qualities.get(quality, quality),
+        media_dir = str(media_dir),
+    )
+    sections = count_sections(path, scene_name, options)
+    log('rendering %d sections of %s', sections, scene_name)
+    context = multiprocessing.get_context('spawn')
+    with concurrent.futures.ProcessPoolExecutor(workers or os.cpu_count(), mp_context=context) as executor:
+        futures = [
+            executor.submit(render_section, path, scene_name, section, options)
+            for section in range(sections)
+        ]
+        movies = [future.result() for future in futures]
+    movies = [movie for movie in movies if movie]
+    if not movies:
+        return None
+    with tempconfig(options):
+        output_path = pathlib.Path(manim_config.get_dir('video_dir', module_name=path.stem))
+        output_path = output_path / f'{scene_name}{manim_config.movie_file_extension}'
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    _concatenate(movies, output_path)
+    log('rendered %s', output_path)
+    return output_path
+
+
+def count_sections(path: pathlib.Path, scene_name: str, options: dict) -> int:
+    with tempconfig(dict(options, dry_run=True)), _only_section(None) as sections:
+        _load_scene(path, scene_name)().render()
+    return sections[0]
+
+
+def render_section(path: pathlib.Path, scene_name: str, section: int, options: dict) -> None|pathlib.Path:
+    media_dir = pathlib.Path(options['media_dir']) / 'canim' / 'sections' / f'{section:04}'
+    with tempconfig(dict(options, media_dir=str(media_dir))), _only_section(section):
+        scene = _load_scene(path, scene_name)()
+        scene.render()
+    file_writer = scene.renderer.file_writer
+    if not any(file_writer.partial_movie_files):
+        return None
+    return pathlib.Path(file_writer.movie_file_path)
+
+
+def _load_scene(path: pathlib.Path, scene_name: str) -> type[Scene]:
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[path.stem] = module
+    spec.loader.exec_module(module)
+    return getattr(module, scene_name)
+
+
+@contextlib.contextmanager
+def _only_section(section: int = None) -> Generator[list[int], None, None]:
+    next_section = SceneFileWriter.next_section
+    parameters = list(inspect.signature(next_section).parameters)
+    if parameters != next_section_parameters:
+        raise RuntimeError(f'unsupported SceneFileWriter.next_section signature: {parameters}')
+    sections = [0]
+    def patched_next_section(self: SceneFileWriter, name: str, type: str, skip_animations: bool) -> None:
+        index = sections[0]
+        if section is not None and index > section:
+            raise EndSceneEarlyException()
+        sections[0] += 1
+        next_section(self, name, type, skip_animations or index != section)
+    SceneFileWriter.next_section = patched_next_section
+    try:
+        yield sections
+    finally:
+        SceneFileWriter.next_section = next_section
+
+
+def _concatenate(movies: list[pathlib.Path], output_path: pathlib.Path) -> None:
+    file_list = output_path.with_suffix('.txt')
+    with open(file_list, 'w') as writer:
+        for movie in movies:
+            movie = movie.as_posix().replace("'", "'\\''")
+            writer.write(f"file '{movie}'\n")
+    try:
+        subprocess.run(
+            [
+                manim_config.ffmpeg_executable,
+                '-y',
+                '-loglevel', 'error',
+                '-f', 'concat',
+                '-safe', '0',
+                '-i', str(file_list),
+                '-c', 'copy',
+                str(output_path),
+            ],
+            check = True,
+        )
+    finally:
+        file_list.unlink()
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m canim.render')
+    parser.add_argument('path')
+    parser.add_argument('scene_name')
+    parser.add_argument('-q', '--quality', default='l', choices=list(qualities))
+    parser.add_argument('-j', '--workers', type=int)
+    parser.add_argument('--media-dir')
+    parser.add_argument('--debug', action='store_true')
+    args = parser.parse_args(argv)
+    if args.debug:
+        set_debug(True)
+    output_path = render(
+        path = args.path,
+        scene_name = args.scene_name,
+        quality = args.quality,
+        workers = args.workers,
+        media_dir = args.media_dir,
+    )
+    if output_path is None:
+        print('no animations were rendered')
+    else:
+        print(output_path)
+
+
+if __name__ == '__main__':
+    main()
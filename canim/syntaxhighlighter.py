@@ -1,20 +1,24 @@
 from __future__ import annotations
-from typing import TextIO
+from typing import Iterable, TextIO
+
+import collections
 
 from pygments import highlight
 from pygments.lexers import get_lexer_by_name
 from pygments.formatter import Formatter
-from pygments.token import Token
+from pygments.token import STANDARD_TYPES, Token, _TokenType
 
 from .utils import log
 
 
 class SyntaxHighligher:
 
-    def __init__(self, language: str, theme: CodeConfig.theme.syntax):
+    def __init__(self, language: str, theme: CodeConfig.theme.syntax, cache_size: int = 4096):
         self.language = language
-        self._lexer = get_lexer_by_name(self.language)
+        self.cache_size = cache_size
+        self._lexer = get_lexer_by_name(self.language, stripnl=False, ensurenl=False)
         self._formatter = PangoFormatter(**theme.as_dict())
+        self._lines: collections.OrderedDict[str, str] = collections.OrderedDict()
     
     def __repr__(self):
         return f'<syntax highlighter for {self.language}>'
@@ -22,6 +26,33 @@ class SyntaxHighligher:
     def highlight(self, text: str) -> str:
         return highlight(text, self._lexer, self._formatter)
 
+    def highlight_lines(self, lines: list[str], context: list[str] = None) -> list[tuple[str, bool]]:
+        buffer = [*(context or []), *lines]
+        highlighted: list[tuple[str, bool]] = []
+        for line in buffer:
+            markup = self._lines.get(line)
+            if markup is None:
+                break
+            self._lines.move_to_end(line)
+            highlighted.append((markup, True))
+        remaining = buffer[len(highlighted):]
+        if remaining:
+            tokens = self._lexer.get_tokens('\n'.join(remaining))
+            results = self._formatter.format_lines(tokens)
+            cache = len(results) == len(remaining)
+            if not cache:
+                log('formatted %d lines out of %d, highlighting line by line', len(results), len(remaining))
+                results = [(self.highlight(line), True) for line in remaining]
+            for index, line in enumerate(remaining):
+                markup, stable = results[index]
+                closed = index + 1 == len(results) or results[index + 1][1]
+                if cache and stable and closed:
+                    self._lines[line] = markup
+                    if len(self._lines) > self.cache_size:
+                        self._lines.popitem(last=False)
+                highlighted.append((markup, stable))
+        return highlighted[len(buffer) - len(lines):]
+
 
 class PangoFormatter(Formatter):
 
@@ -46,12 +77,15 @@ class PangoFormatter(Formatter):
                     attributes[self.value_attributes[value]] = value
             attribute_list = ' '.join(f'{key}="{value}"' for key, value in attributes.items())
             self.tags[token] = f'<span {attribute_list}>', '</span>'
+        self._tags: dict[_TokenType, tuple[str, str]] = {}
+        for token in STANDARD_TYPES:
+            self._resolve(token)
+        log('built pango formatter with %d tags', len(self._tags))
 
-    def format(self, tokens: list[tuple[Token, str]], output: TextIO) -> None:
-        last_token: str = None
+    def format(self, tokens: list[tuple[_TokenType, str]], output: TextIO) -> None:
+        last_token: _TokenType = None
         last_value = ''
         for token, value in tokens:
-            token = str(token)
             if token == last_token:
                 last_value += value
                 continue
@@ -60,19 +94,54 @@ class PangoFormatter(Formatter):
             last_token = token
         output.write(self._entag(last_token, last_value))
     
-    def _entag(self, token: str, value: str) -> str:
+    def format_lines(self, tokens: Iterable[tuple[_TokenType, str]]) -> list[tuple[str, bool]]:
+        lines: list[tuple[str, bool]] = []
+        output: list[str] = []
+        stable = True
+        last_token: _TokenType = None
+        last_value = ''
+        for token, value in tokens:
+            *segments, value = value.split('\n')
+            for segment in segments:
+                if token == last_token:
+                    last_value += segment
+                else:
+                    output.append(self._entag(last_token, last_value))
+                    last_token, last_value = token, segment
+                output.append(self._entag(last_token, last_value))
+                lines.append((''.join(output), stable))
+                output.clear()
+                last_token, last_value = None, ''
+                stable = token in Token.Text
+            if token == last_token:
+                last_value += value
+            else:
+                output.append(self._entag(last_token, last_value))
+                last_token, last_value = token, value
+        output.append(self._entag(last_token, last_value))
+        lines.append((''.join(output), stable))
+        return lines
+
+    def _entag(self, token: _TokenType, value: str) -> str:
         if not value:
             return ''
-        start = end = ''
-        log(f'considering {token} {value!r}')
-        while '.' in token:
-            start, end = self.tags[token]
+        tag = self._tags.get(token)
+        if tag is None:
+            tag = self._resolve(token)
+        start, end = tag
+        return start + value + end
+    
+    def _resolve(self, token: _TokenType) -> tuple[str, str]:
+        tag = '', ''
+        ancestor = token
+        while ancestor.parent is not None:
+            start, end = self.tags.get(str(ancestor), ('', ''))
             if start and end:
-                log(f'matched {token} with tag {start}')
+                tag = start, end
                 break
-            token = token.rsplit('.', 1)[0]
-        log(f'no matching tag found')
-        return start + value + end
+            ancestor = ancestor.parent
+        self._tags[token] = tag
+        return tag
     
 
 from .codeconfig import CodeConfig
\ No newline at end of file
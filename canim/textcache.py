@@ -0,0 +1,147 @@
+from __future__ import annotations
+from typing import Any, Callable
+
+import collections
+import hashlib
+import os
+import pathlib
+
+import manim
+import manimpango
+import numpy as np
+from manim import VMobject, VGroup
+from manim.mobject.text.text_mobject import TEXT2SVG_ADJUSTMENT_FACTOR, TEXT_MOB_SCALE_FACTOR
+
+
+class TextCache:
+
+    version = 2
+    typesetter = (
+        manim.__version__,
+        manimpango.__version__,
+        TEXT_MOB_SCALE_FACTOR,
+        TEXT2SVG_ADJUSTMENT_FACTOR,
+    )
+    _shared: dict[tuple[pathlib.Path, int], TextCache] = {}
+
+    def __init__(self, directory: str|pathlib.Path = None, size: int = 4096):
+        self.directory = pathlib.Path(directory) if directory else None
+        self.size = size
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._texts: collections.OrderedDict[str, VMobject] = collections.OrderedDict()
+
+    def __repr__(self):
+        return f'<text cache: {self.hits} hits ({self.disk_hits} from disk), {self.misses} misses>'
+
+    def __len__(self):
+        return len(self._texts)
+
+    @classmethod
+    def shared(cls, directory: str|pathlib.Path = None, size: int = 4096) -> TextCache:
+        key = pathlib.Path(directory) if directory else None, size
+        if key not in cls._shared:
+            cls._shared[key] = cls(directory, size)
+        return cls._shared[key]
+
+    def get(self, create: Callable[[], VMobject], *key: Any) -> VMobject:
+        digest = self._digest(key)
+        text = self._texts.get(digest)
+        if text is not None:
+            self.hits += 1
+            self._texts.move_to_end(digest)
+            return text.copy()
+        text = self._load(digest)
+        if text is not None:
+            self.hits += 1
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            text = create()
+            self._save(digest, text)
+        self._texts[digest] = text
+        if len(self._texts) > self.size:
+            self._texts.popitem(last=False)
+        return text.copy()
+
+    def clear(self) -> None:
+        self._texts.clear()
+        self.hits = self.disk_hits = self.misses = 0
+
+    def _digest(self, key: tuple[Any, ...]) -> str:
+        return hashlib.sha256(repr((self.version, *self.typesetter, *key)).encode()).hexdigest()
+
+    def _path(self, digest: str) -> pathlib.Path:
+        return self.directory / digest[:2] / f'{digest}.npz'
+
+    def _load(self, digest: str) -> None|CachedText:
+        if not self.directory:
+            return None
+        path = self._path(digest)
+        if not path.exists():
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                return CachedText.from_arrays(**data)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save(self, digest: str, text: VMobject) -> None:
+        if not self.directory:
+            return
+        path = self._path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(temporary_path, 'wb') as writer:
+            np.savez_compressed(writer, **CachedText.to_arrays(text))
+        os.replace(temporary_path, path)
+
+
+class CachedText(VGroup):
+
+    def __init__(self, text: str, original_text: str = None):
+        super().__init__()
+        self.text = text
+        self.original_text = original_text if original_text is not None else text
+
+    def __repr__(self):
+        return f'CachedText({self.original_text!r})'
+
+    @classmethod
+    def from_arrays(
+            cls,
+            text: np.ndarray,
+            original_text: np.ndarray,
+            points: np.ndarray,
+            offsets: np.ndarray,
+            fill: np.ndarray,
+            stroke: np.ndarray,
+            stroke_width: np.ndarray,
+    ) -> CachedText:
+        cached_text = cls(str(text), str(original_text))
+        glyphs = []
+        for index in range(len(offsets) - 1):
+            glyph = VMobject()
+            glyph.set_points(points[offsets[index]:offsets[index + 1]].astype(float))
+            glyph.fill_rgbas = fill[index:index + 1].astype(float)
+            glyph.stroke_rgbas = stroke[index:index + 1].astype(float)
+            glyph.stroke_width = float(stroke_width[index])
+            glyphs.append(glyph)
+        cached_text.add(*glyphs)
+        return cached_text
+
+    @staticmethod
+    def to_arrays(text: VMobject) -> dict[str, np.ndarray]:
+        glyphs = text.submobjects
+        offsets = np.zeros(len(glyphs) + 1, dtype=np.int32)
+        offsets[1:] = np.cumsum([len(glyph.points) for glyph in glyphs])
+        return dict(
+            text = np.array(text.text),
+            original_text = np.array(getattr(text, 'original_text', text.text)),
+            points = np.concatenate([glyph.points for glyph in glyphs] or [np.zeros((0, 3))]).astype(np.float64),
+            offsets = offsets,
+            fill = np.array([glyph.get_fill_rgbas()[0] for glyph in glyphs], dtype=np.float64).reshape(-1, 4),
+            stroke = np.array([glyph.get_stroke_rgbas()[0] for glyph in glyphs], dtype=np.float64).reshape(-1, 4),
+            stroke_width = np.array([glyph.get_stroke_width() for glyph in glyphs], dtype=np.float64),
+        )
@@ -1,16 +1,30 @@
 from __future__ import annotations
-from typing import Any
+from typing import Any, Iterable, Iterator
 
-import datetime as dt
+import copy
 import inspect
+import itertools
+import logging
+import pathlib
 import re
 
 
 indent_regex = re.compile(r'^(\s*)(.*)$')
+tag_regex = re.compile(r'<[^>]*>')
+logger = logging.getLogger('canim')
 
 
-def log(message: str) -> None:
-    print(f'[{dt.datetime.now()}] {message}')
+def log(message: str, *args: Any) -> None:
+    logger.debug(message, *args)
+
+
+def set_debug(debug: bool) -> None:
+    if debug and not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('[%(asctime)s] %(message)s'))
+        logger.addHandler(handler)
+        logger.propagate = False
+    logger.setLevel(logging.DEBUG if debug else logging.WARNING)
 
 
 def split_indent(string: str) -> tuple[str, str]:
@@ -18,40 +32,53 @@ def split_indent(string: str) -> tuple[str, str]:
 
 
 def split_lines(string: str) -> list[str]:
+    return list(iter_lines(string.splitlines()))
+
+
+def iter_lines(lines: Iterable[str]) -> Iterator[str]:
     first_indent: int = None
-    lines: list[str] = []
-    for line in string.splitlines():
-        whitespace, content = split_indent(line)
+    for line in lines:
+        line = line.rstrip('\r\n')
+        content = line.lstrip()
         if not content:
             continue
         if first_indent is None:
-            first_indent = len(whitespace)
-            lines.append(content)
+            first_indent = len(line) - len(content)
+            yield content
         else:
-            indent = len(whitespace) - first_indent
-            lines.append(' ' * indent + content)
-    return lines
+            indent = len(line) - len(content) - first_indent
+            yield ' ' * indent + content
+
+
+def read_lines(path: str|pathlib.Path, start: int = None, end: int = None) -> Iterator[str]:
+    with open(path, encoding='utf-8') as file:
+        yield from iter_lines(itertools.islice(file, start, end))
 
 
 class Config:
 
+    _schema: dict[str, Any] = {}
+
     def __init__(self, parent: Config = None, config_dict: dict[str, Any] = None, /, **config: Any):
         if config_dict is not None:
             config.update(config_dict)
-        fields = {}
-        for cls in self.__class__.__mro__:
-            for key, value in cls.__dict__.items():
-                if key in fields or key.startswith('_'):
-                    continue
-                if inspect.isclass(value):
-                    fields[key] = value(self)
-                elif not hasattr(value, '__get__'):
-                    fields[key] = value
-        for key, value in fields.items():
-            setattr(self, key, value)
         self.update(config)
         self.parent = parent
     
+    def __init_subclass__(cls, **kwargs: Any):
+        super().__init_subclass__(**kwargs)
+        for key, value in list(cls.__dict__.items()):
+            if not key.startswith('_') and inspect.isclass(value):
+                setattr(cls, key, NestedConfig(key, value))
+        schema: dict[str, Any] = {}
+        for base in cls.__mro__:
+            for key, value in base.__dict__.items():
+                if key in schema or key.startswith('_'):
+                    continue
+                if isinstance(value, NestedConfig) or not hasattr(value, '__get__'):
+                    schema[key] = value
+        cls._schema = schema
+    
     def __repr__(self):
         return f'<config {self.as_dict()!r}>'
     
@@ -68,5 +95,34 @@ class Config:
                 if isinstance(value, Config):
                     value.parent = self
     
+    def copy(self) -> Config:
+        config = copy.copy(self)
+        for key, value in self.__dict__.items():
+            if key != 'parent' and isinstance(value, Config):
+                value = value.copy()
+                value.parent = config
+                config.__dict__[key] = value
+        return config
+
     def as_dict(self) -> dict[str, Any]:
-        return {key: value for key, value in self.__dict__.items() if key != 'parent'}
\ No newline at end of file
+        output = {key: getattr(self, key) for key in self._schema}
+        for key, value in self.__dict__.items():
+            if key != 'parent' and not key.startswith('_'):
+                output[key] = value
+        return output
+
+
+class NestedConfig:
+
+    def __init__(self, name: str, config_class: type[Config]):
+        self.name = name
+        self.config_class = config_class
+    
+    def __repr__(self):
+        return f'<nested config {self.name}: {self.config_class.__name__}>'
+    
+    def __get__(self, instance: Config, owner: type[Config] = None) -> Config|type[Config]:
+        if instance is None:
+            return self.config_class
+        config = instance.__dict__[self.name] = self.config_class(instance)
+        return config
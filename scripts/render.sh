@@ -0,0 +1,16 @@
+#!/bin/bash
+
+set -e
+cd "$(dirname "$(dirname "$(realpath "${BASH_SOURCE[0]}" )" )" )"
+
+if [ -z "$1" -o -z "$2" ]
+then
+    echo "USAGE: $0 <scene-path> <scene-name> [workers]"
+    exit 1
+fi
+
+SCENE_PATH="$1"
+SCENE_NAME="$2"
+WORKERS="${3:-$(nproc)}"
+
+.env/bin/python -m canim.render -ql -j "$WORKERS" "$SCENE_PATH" "$SCENE_NAME"
\ No newline at end of file